@@ -1,6 +1,6 @@
 """Configuration management."""
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, List, Mapping, Optional
 import os
 
 
@@ -9,7 +9,26 @@ class AnalysisConfig:
     """Video analysis configuration."""
     sample_interval_seconds: float = 2.5
     max_workers: int = 2
+    plugin_workers: int = 4
     enable_streaming: bool = True
+    enable_pipelined_extraction: bool = True
+    # Keep a lazy full-resolution frame for plugins cropping from it (only in jobs running one)
+    keep_full_resolution_frames: bool = True
+    # Cheap DeepFace detector that must find a face before the accurate one runs
+    face_cascade_detector: Optional[str] = None
+    face_cascade_min_confidence: float = 0.0
+    # Track objects across frames (ultralytics tracker config) instead of independent detections
+    object_tracking: bool = False
+    object_tracker: str = "bytetrack.yaml"
+    object_track_max_skip: int = 0
+    # OCR text-presence check: edge density a 32px cell needs before detection runs (0 disables)
+    ocr_edge_density_threshold: float = 0.08
+    # CRAFT character score a region needs to be recognised
+    ocr_text_threshold: float = 0.3
+    # Reuse the last caption while a frame's 64-bit perceptual hash differs in fewer bits (0 disables)
+    caption_reuse_distance: int = 6
+    # Skip plugins per frame based on earlier plugins' output (services/analysis/gating.py)
+    plugin_gating: bool = True
     enable_aggressive_gc: bool = False
     frame_buffer_limit: int = 2
     memory_cleanup_interval: int = 50
@@ -58,6 +77,69 @@ class AnalysisConfig:
         return 'cpu'
 
 
+@dataclass
+class AnalysisPlan:
+    """Per-job analysis plan derived from `AnalysisRequest.settings`.
+
+    Unset fields fall back to the service-wide `AnalysisConfig`.
+    Supported settings keys:
+        plugins: list of plugin class names or module names to run (default: all)
+        sample_interval_seconds: frame sampling interval
+        target_resolution_height: analysis frame height
+        ocr: run text detection (default: true)
+        captions: run frame captioning (default: true)
+        emotion: classify the emotion of detected faces (default: true)
+        face_detector_backend: DeepFace detector backend for this job
+    """
+    plugins: Optional[List[str]] = None
+    sample_interval_seconds: Optional[float] = None
+    target_resolution_height: Optional[int] = None
+    enable_ocr: bool = True
+    enable_captions: bool = True
+    enable_emotion: bool = True
+    face_detector_backend: Optional[str] = None
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Mapping]) -> "AnalysisPlan":
+        """Build a plan from request settings, raising ValueError on bad values."""
+        settings = settings or {}
+        plan = cls()
+
+        plugins = settings.get("plugins")
+        if plugins is not None:
+            if not isinstance(plugins, list) or not all(isinstance(p, str) for p in plugins):
+                raise ValueError("settings.plugins must be a list of plugin names")
+            plan.plugins = plugins
+
+        interval = settings.get("sample_interval_seconds")
+        if interval is not None:
+            if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+                raise ValueError("settings.sample_interval_seconds must be a positive number")
+            plan.sample_interval_seconds = float(interval)
+
+        resolution = settings.get("target_resolution_height")
+        if resolution is not None:
+            if isinstance(resolution, bool) or not isinstance(resolution, int) or resolution <= 0:
+                raise ValueError("settings.target_resolution_height must be a positive integer")
+            plan.target_resolution_height = resolution
+
+        for key, attr in (("ocr", "enable_ocr"), ("captions", "enable_captions"),
+                          ("emotion", "enable_emotion")):
+            value = settings.get(key)
+            if value is not None:
+                if not isinstance(value, bool):
+                    raise ValueError(f"settings.{key} must be a boolean")
+                setattr(plan, attr, value)
+
+        backend = settings.get("face_detector_backend")
+        if backend is not None:
+            if not isinstance(backend, str) or not backend:
+                raise ValueError("settings.face_detector_backend must be a string")
+            plan.face_detector_backend = backend
+
+        return plan
+
+
 @dataclass
 class TranscriptionConfig:
     """Transcription service configuration."""
@@ -64,6 +64,7 @@ class MessageType(Enum):
     ANALYZE = "analyze"
     TRANSCRIBE = "transcribe"
     HEALTH = "health"
+    REMATCH_FACES = "rematch_faces"
 
     # Server responses
     STATUS = "status"
@@ -74,6 +75,7 @@ class MessageType(Enum):
     TRANSCRIPTION_PROGRESS = "transcription_progress"
     TRANSCRIPTION_COMPLETED = "transcription_completed"
     TRANSCRIPTION_ERROR = "transcription_error"
+    REMATCH_FACES_COMPLETED = "rematch_faces_completed"
     PING = "ping"
     PONG = "pong"
     
@@ -51,6 +51,12 @@ def parse_arguments() -> argparse.Namespace:
         type=int,
         help="Number of analysis workers (default: auto)"
     )
+    parser.add_argument(
+        "--plugin-workers",
+        type=int,
+        default=4,
+        help="Number of plugins that may run concurrently on a frame batch (default: 4)"
+    )
     parser.add_argument(
         "--sample-interval",
         type=float,
@@ -85,6 +91,58 @@ def parse_arguments() -> argparse.Namespace:
         action="store_true",
         help="Enable aggressive garbage collection"
     )
+    parser.add_argument(
+        "--face-cascade-detector",
+        type=str,
+        default=None,
+        help="Fast face detector (e.g. opencv, yunet, ssd) that gates the accurate one; off by default"
+    )
+    parser.add_argument(
+        "--face-cascade-min-confidence",
+        type=float,
+        default=0.0,
+        help="Confidence a fast-detector face needs to run the accurate detector (default: 0.0)"
+    )
+    parser.add_argument(
+        "--object-tracking",
+        action="store_true",
+        help="Track objects across frames and report per-track time ranges"
+    )
+    parser.add_argument(
+        "--object-tracker",
+        type=str,
+        default="bytetrack.yaml",
+        help="Ultralytics tracker config: bytetrack.yaml or botsort.yaml (default: bytetrack.yaml)"
+    )
+    parser.add_argument(
+        "--object-track-max-skip",
+        type=int,
+        default=0,
+        help="Frames object detection may skip in a row while tracks are stable (default: 0)"
+    )
+    parser.add_argument(
+        "--ocr-edge-density-threshold",
+        type=float,
+        default=0.08,
+        help="Edge density a frame region needs before OCR runs; 0 runs OCR on every frame (default: 0.08)"
+    )
+    parser.add_argument(
+        "--ocr-text-threshold",
+        type=float,
+        default=0.3,
+        help="Text detector score a region needs to be recognised (default: 0.3)"
+    )
+    parser.add_argument(
+        "--caption-reuse-distance",
+        type=int,
+        default=6,
+        help="Reuse the previous caption for frames whose perceptual hash differs in fewer bits; 0 disables (default: 6)"
+    )
+    parser.add_argument(
+        "--no-plugin-gating",
+        action="store_true",
+        help="Run every plugin on every frame instead of gating on earlier plugins' output"
+    )
     parser.add_argument(
         "--buffer-limit",
         type=int,
@@ -117,7 +175,17 @@ def create_analysis_config(args: argparse.Namespace) -> AnalysisConfig:
         sample_interval_seconds=args.sample_interval,
         target_resolution_height=args.target_resolution,
         enable_aggressive_gc=args.aggressive_gc,
-        frame_buffer_limit=args.buffer_limit
+        frame_buffer_limit=args.buffer_limit,
+        plugin_workers=args.plugin_workers,
+        face_cascade_detector=args.face_cascade_detector,
+        face_cascade_min_confidence=args.face_cascade_min_confidence,
+        object_tracking=args.object_tracking,
+        object_tracker=args.object_tracker,
+        object_track_max_skip=args.object_track_max_skip,
+        ocr_edge_density_threshold=args.ocr_edge_density_threshold,
+        ocr_text_threshold=args.ocr_text_threshold,
+        caption_reuse_distance=args.caption_reuse_distance,
+        plugin_gating=not args.no_plugin_gating
     )
 
     if args.analysis_workers:
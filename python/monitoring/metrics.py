@@ -73,6 +73,9 @@ class PluginMetrics:
     max_time_ms: float = 0.0
     timeout_count: int = 0
     error_count: int = 0
+    gated_count: int = 0
+    reused_count: int = 0
+    reuse_ratio: float = 0.0
     
     def to_dict(self) -> Dict[str, Union[str, int, float]]:
         """Convert to dictionary."""
@@ -86,6 +89,8 @@ class PluginMetricsCollector:
         self._timings: Dict[str, List[float]] = defaultdict(list)
         self._errors: Dict[str, int] = defaultdict(int)
         self._timeouts: Dict[str, int] = defaultdict(int)
+        self._gated: Dict[str, int] = defaultdict(int)
+        self._reused: Dict[str, int] = defaultdict(int)
     
     def record_execution(self, plugin_name: str, duration_ms: float) -> None:
         """Record a plugin execution time."""
@@ -99,24 +104,39 @@ class PluginMetricsCollector:
     def record_timeout(self, plugin_name: str) -> None:
         """Record a plugin timeout."""
         self._timeouts[plugin_name] += 1
+
+    def record_gated(self, plugin_name: str, count: int = 1) -> None:
+        """Record frames a plugin skipped because a cheap check ruled them out."""
+        self._gated[plugin_name] += count
+
+    def record_reused(self, plugin_name: str, count: int = 1) -> None:
+        """Record frames whose result a plugin reused from an earlier frame."""
+        self._reused[plugin_name] += count
     
     def get_metrics(self) -> List[PluginMetrics]:
         """Get aggregated metrics for all plugins."""
         metrics = []
         
-        for plugin_name, timings in self._timings.items():
-            if not timings:
+        for plugin_name in list(self._timings) + [
+                name for name in self._gated if name not in self._timings]:
+            timings = self._timings.get(plugin_name, [])
+            gated = self._gated.get(plugin_name, 0)
+            reused = self._reused.get(plugin_name, 0)
+            if not timings and not gated:
                 continue
             
             metrics.append(PluginMetrics(
                 plugin_name=plugin_name,
                 total_duration_seconds=sum(timings) / 1000,
                 frames_processed=len(timings),
-                avg_time_per_frame_ms=sum(timings) / len(timings),
-                min_time_ms=min(timings),
-                max_time_ms=max(timings),
+                avg_time_per_frame_ms=sum(timings) / len(timings) if timings else 0.0,
+                min_time_ms=min(timings) if timings else 0.0,
+                max_time_ms=max(timings) if timings else 0.0,
                 timeout_count=self._timeouts.get(plugin_name, 0),
-                error_count=self._errors.get(plugin_name, 0)
+                error_count=self._errors.get(plugin_name, 0),
+                gated_count=gated,
+                reused_count=reused,
+                reuse_ratio=reused / len(timings) if timings else 0.0
             ))
         
         # Sort by total duration (highest first)
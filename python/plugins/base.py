@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Union, List, TypedDict, Optional
+from typing import Dict, Union, List, TypedDict, Optional, Tuple
 import numpy as np
-from core.config import AnalysisConfig
+from core.config import AnalysisConfig, AnalysisPlan
 
 
 class FrameAnalysis(TypedDict, total=False):
@@ -12,6 +12,8 @@ class FrameAnalysis(TypedDict, total=False):
     frame_idx: int
     scale_factor: float
     job_id: str
+    # Lazy full-resolution frame, only present while plugins run
+    source_frame: object
 
     objects: List[Dict[str, str]]
     faces: List[Dict[str, str]]
@@ -34,8 +36,27 @@ class AnalyzerPlugin(ABC):
 
     Plugins extend the video analysis pipeline by processing frames
     and extracting specific types of information (objects, faces, etc).
+
+    `provides` lists the FrameAnalysis keys a plugin writes and `requires`
+    the keys it reads from other plugins; the PluginManager uses them to
+    run independent plugins concurrently while keeping dependencies ordered.
+
+    Frames are BGR; plugins needing RGB, grayscale, HSV or a downscale ask
+    `utils.frame_views.get_view(frame, name)`, which computes each view once
+    per frame for all plugins.
     """
 
+    provides: Tuple[str, ...] = ()
+    requires: Tuple[str, ...] = ()
+
+    # Frames the plugin ruled out with a cheap check, reported in plugin metrics
+    gated_frames: int = 0
+    # Frames whose result was copied from an earlier, similar frame
+    reused_frames: int = 0
+    # Whether the plugin reads the full-resolution `source_frame`; it is only
+    # kept for jobs running such a plugin, and released once they ran
+    uses_source_frame: bool = False
+
     def __init__(self, config: AnalysisConfig):
         """
         Initialize plugin with configuration.
@@ -52,6 +73,13 @@ class AnalyzerPlugin(ABC):
         """
         pass
     
+    def configure_job(self, plan: AnalysisPlan) -> None:
+        """
+        Apply per-job settings from the request's analysis plan.
+        Called before `setup`; the default ignores the plan.
+        """
+        pass
+
     @abstractmethod
     def setup(self, video_path: str, job_id: str) -> None:
         """
@@ -80,6 +108,36 @@ class AnalyzerPlugin(ABC):
         """
         pass
 
+    def analyze_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str,
+    ) -> List[FrameAnalysis]:
+        """
+        Analyze several video frames at once.
+
+        Plugins backed by models that accept batched input should override
+        this; the default falls back to calling `analyze_frame` per frame.
+
+        Args:
+            frames: Video frames as NumPy arrays (BGR format)
+            frame_analyses: Existing analysis data, one entry per frame
+            video_path: Path to the video being analyzed
+
+        Returns:
+            Updated frame_analysis dictionaries, in the same order as frames
+        """
+        return [
+            self.analyze_frame(frame, frame_analysis, video_path)
+            for frame, frame_analysis in zip(frames, frame_analyses)
+        ]
+
+    @classmethod
+    def supports_batching(cls) -> bool:
+        """Whether this plugin provides its own `analyze_batch`."""
+        return cls.analyze_batch is not AnalyzerPlugin.analyze_batch
+
     @abstractmethod
     def get_results(self) -> PluginResult:
         """
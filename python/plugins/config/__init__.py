@@ -2,6 +2,6 @@
 Configuration module for analyzer plugins.
 """
 
-from .colors import COLOR_NAMES, get_color_name, rgb_to_hex
+from .colors import COLOR_NAMES, get_color_name, get_color_names, rgb_to_hex
 
-__all__ = ['COLOR_NAMES', 'get_color_name', 'rgb_to_hex']
+__all__ = ['COLOR_NAMES', 'get_color_name', 'get_color_names', 'rgb_to_hex']
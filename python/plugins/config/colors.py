@@ -2,7 +2,9 @@
 Color configuration for the DominantColorPlugin.
 Defines named colors and their RGB values for color matching.
 """
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 # Standard color names mapped to RGB values
 COLOR_NAMES: Dict[Tuple[int, int, int], str] = {
@@ -94,6 +96,47 @@ COLOR_NAMES: Dict[Tuple[int, int, int], str] = {
 }
 
 
+# Bits per channel of the RGB -> name lookup table (64 levels, 256 KB)
+LOOKUP_BITS = 6
+
+_NAME_LIST: List[str] = list(COLOR_NAMES.values())
+_name_lookup: Optional[np.ndarray] = None
+
+
+def _build_name_lookup() -> np.ndarray:
+    """Index of the closest named color for the centre of every quantised RGB cell."""
+    levels = 1 << LOOKUP_BITS
+    step = 256 // levels
+    centres = np.arange(levels, dtype=np.int32) * step + step // 2
+    grid = np.stack(np.meshgrid(centres, centres, centres, indexing="ij"), axis=-1).reshape(-1, 3)
+    known = np.array(list(COLOR_NAMES.keys()), dtype=np.int32)
+
+    lookup = np.empty(len(grid), dtype=np.uint8)
+    for start in range(0, len(grid), 16384):
+        chunk = grid[start:start + 16384]
+        distances = ((chunk[:, None, :] - known[None, :, :]) ** 2).sum(axis=2)
+        lookup[start:start + len(chunk)] = distances.argmin(axis=1)
+    return lookup
+
+
+def get_color_names(rgbs: np.ndarray) -> List[str]:
+    """
+    Closest named color of every row of an (N, 3) RGB array.
+
+    Names come from a table precomputed on first use, so a lookup is a
+    single indexing operation instead of a distance scan over COLOR_NAMES.
+    Colors are quantised to LOOKUP_BITS per channel first.
+    """
+    global _name_lookup
+    if _name_lookup is None:
+        _name_lookup = _build_name_lookup()
+
+    shift = 8 - LOOKUP_BITS
+    rgb = np.clip(np.asarray(rgbs, dtype=np.int32).reshape(-1, 3), 0, 255) >> shift
+    cells = (rgb[:, 0] << (2 * LOOKUP_BITS)) | (rgb[:, 1] << LOOKUP_BITS) | rgb[:, 2]
+    return [_NAME_LIST[i] for i in _name_lookup[cells]]
+
+
 def get_color_name(rgb: Tuple[int, int, int]) -> str:
     """
     Find the closest named color to the given RGB value.
@@ -104,17 +147,7 @@ def get_color_name(rgb: Tuple[int, int, int]) -> str:
     Returns:
         The name of the closest matching color
     """
-    min_distance = float('inf')
-    closest_name = "Unknown"
-
-    for known_rgb, name in COLOR_NAMES.items():
-        # Calculate Euclidean distance in RGB space
-        distance = sum((a - b) ** 2 for a, b in zip(rgb, known_rgb))
-        if distance < min_distance:
-            min_distance = distance
-            closest_name = name
-
-    return closest_name
+    return get_color_names(np.array([rgb]))[0]
 
 
 def rgb_to_hex(rgb: Tuple[int, int, int]) -> str:
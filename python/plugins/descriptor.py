@@ -1,25 +1,43 @@
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Union
+import cv2
 import numpy as np
 import os
+import time
 from plugins.base import AnalyzerPlugin, FrameAnalysis
 from PIL import Image
 import torch
 from transformers import BlipProcessor, BlipForConditionalGeneration
 from services.logger import get_logger
 from core.config import AnalysisConfig
+from utils.batching import AdaptiveBatchSize
+from utils.frame_views import get_view
 
 logger = get_logger(__name__)
 
+MAX_NEW_TOKENS = 40
+# Rough peak memory of one 384x384 image through the BLIP vision encoder and decoder
+BLIP_BYTES_PER_FRAME = 160 * 1024 * 1024
+
 
 class DescriptorPlugin(AnalyzerPlugin):
     """Frame Descriptor classifier using BLIP."""
 
+    provides = ('description',)
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.processor: Optional[BlipProcessor] = None
         self.model: Optional[BlipForConditionalGeneration] = None
         self.descriptions = []
         self.device = config.get("device", "cpu")
+        self.batch_sizer = AdaptiveBatchSize(
+            max_batch_size=16,
+            bytes_per_item=BLIP_BYTES_PER_FRAME
+        )
+        # Frames within this many hash bits of the last captioned frame reuse its caption
+        self.reuse_distance: int = config.get("caption_reuse_distance", 0)
+        self._last_hash: Optional[int] = None
+        self._last_caption: Optional[str] = None
 
     def load_models(self) -> None:
         """Load BLIP captioning model."""
@@ -49,28 +67,95 @@ class DescriptorPlugin(AnalyzerPlugin):
         return None
     
     def setup(self, video_path, job_id) -> None:
-        return None
+        self._last_hash = None
+        self._last_caption = None
 
     def analyze_frame(self, frame: np.ndarray, frame_analysis: FrameAnalysis, video_path: str) -> FrameAnalysis:
         """Caption each frame to understand its environment."""
+        return self.analyze_batch([frame], [frame_analysis], video_path)[0]
+
+    def analyze_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str
+    ) -> List[FrameAnalysis]:
+        """
+        Caption the batch, reusing captions across near-identical frames.
+
+        A frame whose perceptual hash is within `caption_reuse_distance` bits
+        of the last captioned frame gets that frame's caption; only the
+        others are sent to BLIP.
+        """
         if self.processor is None or self.model is None:
-            return frame_analysis
-
-        image = Image.fromarray(frame)
-
-        inputs = self.processor(image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            out = self.model.generate(**inputs, max_new_tokens=40)
-
-        caption = self.processor.decode(out[0], skip_special_tokens=True)
-        caption = caption.lower()
-
-        self.descriptions.append(caption)
-        frame_analysis["description"] = caption
-
-        return frame_analysis
+            return frame_analyses
+
+        # Each frame's caption source: its own index in the batch, or -1 for the last captioned frame
+        sources: List[int] = []
+        to_caption: List[int] = []
+        anchor, anchor_hash = -1, self._last_hash
+        for i, frame in enumerate(frames):
+            frame_hash = self._perceptual_hash(frame) if self.reuse_distance > 0 else None
+            if (frame_hash is not None and anchor_hash is not None
+                    and bin(frame_hash ^ anchor_hash).count("1") < self.reuse_distance):
+                sources.append(anchor)
+                continue
+            anchor, anchor_hash = i, frame_hash
+            sources.append(i)
+            to_caption.append(i)
+
+        generated = dict(zip(
+            to_caption, self._generate_captions([frames[i] for i in to_caption])))
+
+        for i, (frame_analysis, source) in enumerate(zip(frame_analyses, sources)):
+            caption = generated[source] if source >= 0 else self._last_caption
+            if source != i:
+                self.reused_frames += 1
+            self.descriptions.append(caption)
+            frame_analysis["description"] = caption
+
+        if anchor >= 0:
+            self._last_caption = generated[anchor]
+        self._last_hash = anchor_hash
+        return frame_analyses
+
+    def _generate_captions(self, frames: List[np.ndarray]) -> List[str]:
+        """
+        Caption frames in generate chunks sized by measured latency.
+
+        The processor prepares every frame in one call; `generate` then runs
+        over chunks whose size grows while the per-frame time keeps dropping,
+        capped by free memory on the device.
+        """
+        if not frames:
+            return []
+
+        images = [Image.fromarray(get_view(frame, "rgb")) for frame in frames]
+        pixel_values = self.processor(images=images, return_tensors="pt")["pixel_values"]
+
+        captions: List[str] = []
+        start = 0
+        while start < len(frames):
+            size = self.batch_sizer.next_size(len(frames) - start, self.device)
+            chunk = pixel_values[start:start + size].to(self.device, dtype=self.model.dtype)
+
+            started_at = time.perf_counter()
+            with torch.no_grad():
+                out = self.model.generate(pixel_values=chunk, max_new_tokens=MAX_NEW_TOKENS)
+            self.batch_sizer.record(len(chunk), time.perf_counter() - started_at)
+
+            captions.extend(self.processor.batch_decode(out, skip_special_tokens=True))
+            start += size
+
+        return [caption.lower() for caption in captions]
+
+    @staticmethod
+    def _perceptual_hash(frame: np.ndarray) -> int:
+        """64-bit pHash: signs of the 8x8 lowest DCT frequencies against their median."""
+        small = get_view(frame, "gray_32")
+        low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()
+        bits = low > np.median(low[1:])
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
 
     def get_results(self) -> Optional[Dict[str, Union[str, float, Dict[str, int], int]]]:
         return {
@@ -83,6 +168,8 @@ class DescriptorPlugin(AnalyzerPlugin):
     def cleanup(self) -> None:
         """Clean up any data from previous processing job."""
         self.descriptions = []
+        self._last_hash = None
+        self._last_caption = None
         
     def cleanup_models(self) -> None:
         try:
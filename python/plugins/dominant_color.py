@@ -1,14 +1,19 @@
 from typing import List, Dict, Tuple, Optional, Union
 from dataclasses import dataclass, asdict
 import numpy as np
-import cv2
 from collections import Counter
-from sklearn.cluster import KMeans
 import colorsys
 
 from core.config import AnalysisConfig
 from plugins.base import AnalyzerPlugin, FrameAnalysis
-from plugins.config.colors import get_color_name, rgb_to_hex
+from plugins.config.colors import get_color_names, rgb_to_hex
+from services.logger import get_logger
+from utils.frame_views import get_view
+
+logger = get_logger(__name__)
+
+# Mini-batch k-means iterations per frame when more than one color is extracted
+KMEANS_ITERATIONS = 10
 
 
 @dataclass
@@ -45,13 +50,17 @@ class SceneColorAnalysis:
 class DominantColorPlugin(AnalyzerPlugin):
     """Plugin for analyzing dominant colors, color palettes, and color moods in video frames."""
 
+    provides = ('dominant_color',)
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.num_colors = 1
         self.sample_size = 500
-        self.color_resize = 100
         self.frame_colors: List[Dict[str,
                                      Union[int, List[ColorInfo], float]]] = []
+        # Palette of the previous frame, the starting point for the next one
+        self._previous_centers: Optional[np.ndarray] = None
+        self._rng = np.random.default_rng(42)
 
     def load_models(self) -> None:
         return None
@@ -59,12 +68,17 @@ class DominantColorPlugin(AnalyzerPlugin):
     def setup(self, video_path, job_id) -> None:
         """Initialize the plugin for a new video."""
         self.frame_colors = []
+        self._previous_centers = None
+        self._rng = np.random.default_rng(42)
 
     def analyze_frame(self, frame: np.ndarray, frame_analysis: FrameAnalysis, video_path: str) -> FrameAnalysis:
         """Extract dominant colors and color properties from a frame."""
         try:
+            # One shared 100x100 downscale feeds the palette, brightness and saturation
+            rgb_frame = get_view(frame, "tiny_rgb").astype(np.float32)
+
             dominant_color_objects = self._extract_dominant_colors(
-                frame, self.num_colors)
+                rgb_frame, self.num_colors)
             brightness = self._calculate_brightness(frame)
             saturation = self._calculate_saturation(frame)
             warmth = self._calculate_warmth(dominant_color_objects)
@@ -81,53 +95,41 @@ class DominantColorPlugin(AnalyzerPlugin):
             frame_analysis['dominant_color'] = dominant_color_objects[0].to_json_dict()
 
         except Exception as e:
-            print(
-                f"  Warning: Color analysis failed for frame: {e}", flush=True)
+            logger.warning(f"Color analysis failed for frame: {e}")
             frame_analysis['dominant_color'] = None
 
         return frame_analysis
 
-    def _extract_dominant_colors(self, frame: np.ndarray, num_colors: int) -> List[ColorInfo]:
-        """Extract dominant colors using K-Means clustering."""
+    def _extract_dominant_colors(self, rgb_frame: np.ndarray, num_colors: int) -> List[ColorInfo]:
+        """Extract dominant colors: the mean color for one, mini-batch k-means for more."""
         try:
-            # Resize and convert to RGB
-            small_frame = cv2.resize(
-                frame, (self.color_resize, self.color_resize))
-            rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
             pixels = rgb_frame.reshape(-1, 3)
 
-            # Sample pixels if needed
-            if len(pixels) > self.sample_size:
-                indices = np.random.choice(
-                    len(pixels), self.sample_size, replace=False)
-                pixels = pixels[indices]
-
-            # Perform K-Means clustering
-            kmeans = KMeans(
-                n_clusters=num_colors,
-                random_state=42,
-                n_init=5,
-                max_iter=100,
-                tol=0.01,
-            )
-            kmeans.fit(pixels)
-
-            colors = kmeans.cluster_centers_.astype(int)
-            labels = kmeans.labels_
-            label_counts = Counter(labels)
-            total_pixels = len(labels)
+            if num_colors <= 1:
+                centers = pixels.mean(axis=0, keepdims=True)
+                counts = np.array([len(pixels)])
+            else:
+                centers = self._mini_batch_kmeans(pixels, num_colors)
+                counts = np.bincount(
+                    self._nearest_centers(pixels, centers), minlength=num_colors)
+
+            colors = np.clip(np.rint(centers), 0, 255).astype(int)
+            names = get_color_names(colors)
+            total_pixels = len(pixels)
 
             # Create ColorInfo objects
             color_info_list: List[ColorInfo] = []
-            for i, color_rgb_array in enumerate(colors):
-                rgb_tuple = tuple(color_rgb_array)
-                percentage = (label_counts[i] / total_pixels) * 100
+            for color_rgb_array, name, count in zip(colors, names, counts):
+                if count == 0:
+                    continue
+                rgb_tuple = tuple(int(c) for c in color_rgb_array)
+                percentage = (count / total_pixels) * 100
 
                 color_info = ColorInfo(
-                    name=get_color_name(rgb_tuple),
+                    name=name,
                     hex=rgb_to_hex(rgb_tuple),
                     rgb=rgb_tuple,
-                    percentage=round(percentage, 2),
+                    percentage=round(float(percentage), 2),
                     is_vibrant=self._is_vibrant(rgb_tuple),
                     is_muted=self._is_muted(rgb_tuple),
                 )
@@ -138,9 +140,50 @@ class DominantColorPlugin(AnalyzerPlugin):
             return color_info_list
 
         except Exception as e:
-            print(f"  Warning: K-Means clustering failed: {e}", flush=True)
+            logger.warning(f"Color clustering failed: {e}")
             return []
 
+    def _mini_batch_kmeans(self, pixels: np.ndarray, num_colors: int) -> np.ndarray:
+        """
+        Mini-batch k-means over sampled pixels, warm-started from the previous frame.
+
+        Consecutive frames mostly share a palette, so the previous centers are
+        a close starting point and a few small batches are enough to follow
+        the changes.
+        """
+        batch_size = min(self.sample_size, len(pixels))
+        if self._previous_centers is not None and len(self._previous_centers) == num_colors:
+            centers = self._previous_centers.copy()
+            # The warm start counts as one batch, so the first update doesn't discard it
+            counts = np.full(num_colors, batch_size / num_colors)
+        else:
+            centers = pixels[self._rng.choice(len(pixels), num_colors, replace=False)].copy()
+            counts = np.zeros(num_colors)
+
+        for _ in range(KMEANS_ITERATIONS):
+            batch = pixels[self._rng.choice(len(pixels), batch_size, replace=False)]
+            labels = self._nearest_centers(batch, centers)
+            batch_counts = np.bincount(labels, minlength=num_colors)
+            sums = np.stack([
+                np.bincount(labels, weights=batch[:, channel], minlength=num_colors)
+                for channel in range(3)
+            ], axis=1)
+
+            updated = batch_counts > 0
+            counts[updated] += batch_counts[updated]
+            rate = (batch_counts[updated] / counts[updated])[:, None]
+            batch_means = sums[updated] / batch_counts[updated][:, None]
+            centers[updated] += rate * (batch_means - centers[updated])
+
+        self._previous_centers = centers
+        return centers
+
+    @staticmethod
+    def _nearest_centers(pixels: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        """Index of the closest center for every pixel."""
+        distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1)
+
     def _is_vibrant(self, rgb: Tuple[int, int, int]) -> bool:
         """Check if a color is vibrant (high saturation and brightness)."""
         max_val = max(rgb)
@@ -161,18 +204,15 @@ class DominantColorPlugin(AnalyzerPlugin):
         return saturation < 0.3
 
     def _calculate_brightness(self, frame: np.ndarray) -> float:
-        """Calculate overall brightness of frame (0-100)."""
-        small = cv2.resize(frame, (50, 50))
-        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-        brightness = np.mean(gray) / 255 * 100
+        """Calculate overall brightness of frame (0-100), as mean grey level."""
+        gray = get_view(frame, "tiny_gray")
+        brightness = float(np.mean(gray)) / 255 * 100
         return round(brightness, 2)
 
     def _calculate_saturation(self, frame: np.ndarray) -> float:
-        """Calculate overall saturation of frame (0-100)."""
-        small = cv2.resize(frame, (50, 50))
-        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
-        saturation = hsv[:, :, 1]
-        avg_saturation = np.mean(saturation) / 255 * 100
+        """Calculate overall saturation of frame (0-100), as mean HSV S channel."""
+        saturation = get_view(frame, "tiny_hsv")[:, :, 1]
+        avg_saturation = float(np.mean(saturation)) / 255 * 100
         return round(avg_saturation, 2)
 
     def _calculate_warmth(self, colors: List[ColorInfo]) -> float:
@@ -1,36 +1,80 @@
 from services.logger import get_logger
 import os
 import json
+import time
 import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
 import cv2
 import numpy as np
 
 from services.analysis.face_recognizer import FaceRecognizer
+from services.analysis.face_tracker import FaceTracker
+from services.analysis.unknown_faces import UnknownFaceEmbeddingIndex
 from plugins.base import AnalyzerPlugin, FrameAnalysis, PluginResult
 from utils.helpers import format_duration
-from core.config import AnalysisConfig
+from core.config import AnalysisConfig, AnalysisPlan
 
 logger = get_logger(__name__)
 
+# Identity fields carried along a face track between re-identifications
+TRACKED_FIELDS = ("name", "confidence", "is_clustered", "emotion_label", "emotion_confidence")
+
+# Seconds between writes of buffered unknown face appearances and store clusters
+APPEARANCE_FLUSH_INTERVAL = 10.0
+
+# Hidden folder of UNKNOWN_FACES_DIR holding one manifest of saved files per job
+JOB_INDEX_DIR = ".jobs"
+JOB_INDEX_MARKER = ".indexed"
+
 
 class FaceRecognitionPlugin(AnalyzerPlugin):
     """A plugin for detecting faces in video frames using DeepFace (Default mode will be VGG-Face, using yolov8n)."""
 
+    provides = ('faces',)
+    # Unknown faces are cropped from the full-resolution frame
+    uses_source_frame = True
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.face_recognizer: Optional[FaceRecognizer] = None
         self.all_faces: List[Dict] = []
         self.unknown_faces_dir: Optional[Path] = None
         self.saved_unknown_faces: Dict[str, Dict] = {}
+        self._pending_appearances: Set[str] = set()
+        self._job_artifacts: List[str] = []
+        self._last_appearance_flush = 0.0
         self.current_video_path: str = ""
         self.current_job_id: str = ""
+        self.default_detector_backend: Optional[str] = None
+        self.embedding_index: Optional[UnknownFaceEmbeddingIndex] = None
+        self.enable_tracking: bool = True
+        self.face_tracker = FaceTracker()
+        self.tracking_stats: Dict[str, int] = {"identified": 0, "propagated": 0}
+        # Serialises unknown face file writes of the running job with face rematch requests
+        self._store_lock = threading.RLock()
 
     def load_models(self) -> None:
-        self.face_recognizer = FaceRecognizer()
+        self.face_recognizer = FaceRecognizer(
+            cascade_detector_backend=self.config.get("face_cascade_detector"),
+            cascade_min_confidence=self.config.get("face_cascade_min_confidence", 0.0)
+        )
+        self.face_recognizer.load_gallery()
+        unknown_faces_dir = os.getenv("UNKNOWN_FACES_DIR", '.unknown_faces')
+        self.embedding_index = UnknownFaceEmbeddingIndex(unknown_faces_dir)
+        if os.getenv("PERSIST_UNKNOWN_FACES", "true").lower() != "false":
+            self.face_recognizer.load_unknown_store(
+                os.path.join(unknown_faces_dir, ".store"))
+        self.default_detector_backend = self.face_recognizer.detector_backend
+
+    def configure_job(self, plan: AnalysisPlan) -> None:
+        if self.face_recognizer:
+            self.face_recognizer.detector_backend = (
+                plan.face_detector_backend or self.default_detector_backend)
+            self.face_recognizer.analyze_emotion = plan.enable_emotion
 
     def setup(self, video_path: str, job_id: str) -> None:
         self.current_video_path = video_path
@@ -42,7 +86,14 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
             os.getenv("UNKNOWN_FACES_DIR", '.unknown_faces'))
         self.unknown_faces_dir.mkdir(parents=True, exist_ok=True)
 
-        self._cleanup_previous_run()
+        self.face_tracker.reset()
+        self.tracking_stats = {"identified": 0, "propagated": 0}
+        self._pending_appearances = set()
+        self._last_appearance_flush = time.monotonic()
+        self._job_artifacts = []
+
+        with self._store_lock:
+            self._cleanup_previous_run()
 
     def analyze_frame(
         self,
@@ -50,18 +101,50 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         frame_analysis: FrameAnalysis,
         video_path: str
     ) -> FrameAnalysis:
+        return self.analyze_batch([frame], [frame_analysis], video_path)[0]
+
+    def analyze_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str
+    ) -> List[FrameAnalysis]:
+        """Recognize faces frame by frame, then classify emotion for the whole batch at once."""
         if not self.face_recognizer:
             logger.warning("Face recognizer not initialized")
-            frame_analysis['faces'] = []
-            return frame_analysis
-
+            for frame_analysis in frame_analyses:
+                frame_analysis['faces'] = []
+            return frame_analyses
+
+        pending_emotions: List[Tuple[Dict, Optional[Dict], np.ndarray]] = []
+        recognized_per_frame = [
+            self._recognize_with_tracking(frame, pending_emotions) for frame in frames
+        ]
+        self._assign_emotions(pending_emotions, recognized_per_frame)
+
+        results = [
+            self._build_frame_faces(frame, frame_analysis, recognized_faces, video_path)
+            for frame, frame_analysis, recognized_faces
+            in zip(frames, frame_analyses, recognized_per_frame)
+        ]
+
+        if time.monotonic() - self._last_appearance_flush >= APPEARANCE_FLUSH_INTERVAL:
+            self._flush_appearances()
+        return results
+
+    def _build_frame_faces(
+        self,
+        frame: np.ndarray,
+        frame_analysis: FrameAnalysis,
+        recognized_faces: List[Dict],
+        video_path: str
+    ) -> FrameAnalysis:
         height, width = frame.shape[:2]
         scale_factor = float(frame_analysis.get('scale_factor', 1.0))
         frame_idx = frame_analysis.get('frame_idx', 0)
         timestamp_ms = int(frame_analysis['start_time_ms'])
+        source_frame = frame_analysis.get('source_frame')
 
-        recognized_faces = self.face_recognizer.recognize_faces(frame)
-        
         logger.info(f"We recognized {len(recognized_faces)} faces")
 
         output_faces = []
@@ -78,7 +161,8 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
             if face['name'].startswith("Unknown_"):
                 saved = self._track_unknown_face(
                     frame, timestamp_ms, frame_idx, face,
-                    video_path, frame_analysis["job_id"], scale_factor
+                    video_path, frame_analysis["job_id"], scale_factor,
+                    source_frame
                 )
                 if saved:
                     self.all_faces.append({
@@ -109,6 +193,96 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         frame_analysis['faces'] = output_faces
         return frame_analysis
 
+    def _recognize_with_tracking(
+        self,
+        frame: np.ndarray,
+        pending_emotions: List[Tuple[Dict, Optional[Dict], np.ndarray]]
+    ) -> List[Dict]:
+        """Detect faces and identify only those that aren't continuing a known track.
+
+        Faces matched to a live track reuse its identity (name, confidence and
+        emotion); new faces, faces of lost tracks and tracks due for a refresh
+        go through embedding and matching, and their crops are queued in
+        `pending_emotions` for the batched emotion step. Frames the cascade
+        detector finds no face in skip detection altogether.
+        """
+        if not self.face_recognizer.has_face_candidates(frame):
+            self.gated_frames += 1
+            self.face_tracker.assign([])
+            return []
+
+        face_objs = self.face_recognizer.detect_faces(frame)
+        if not self.enable_tracking:
+            identified = self.face_recognizer.identify_faces(face_objs, defer_emotion=True)
+            for face in identified:
+                pending_emotions.append((face, None, face.pop("face_crop")))
+            self.tracking_stats["identified"] += len(identified)
+            return identified
+
+        tracks = self.face_tracker.assign([f['location'] for f in face_objs])
+        # identify_faces drops faces that fail, so each is identified on its own
+        # to keep results keyed by detection index (emotions are deferred anyway)
+        pending: Dict[int, Optional[Dict]] = {}
+        for i, track in enumerate(tracks):
+            if self.face_tracker.needs_identification(track):
+                identified = self.face_recognizer.identify_faces(
+                    [face_objs[i]], defer_emotion=True)
+                pending[i] = identified[0] if identified else None
+
+        recognized_faces = []
+        for i, (face_obj, track) in enumerate(zip(face_objs, tracks)):
+            location = face_obj['location']
+
+            if i in pending:
+                face = pending[i]
+                if face is None:
+                    continue
+                identity = {key: face.get(key) for key in TRACKED_FIELDS}
+                self.face_tracker.refresh(track, location, identity)
+                pending_emotions.append((face, identity, face.pop("face_crop")))
+                self.tracking_stats["identified"] += 1
+            else:
+                face = self.face_tracker.propagate(track, location)
+                face.update({
+                    "location": location,
+                    "detection_confidence": face_obj.get("confidence", 1.0) * 100,
+                    "embedding": None,
+                    # Emotion of this identity may still be pending in the current batch
+                    "_identity": track.identity,
+                })
+                self.tracking_stats["propagated"] += 1
+
+            recognized_faces.append(face)
+
+        return recognized_faces
+
+    def _assign_emotions(
+        self,
+        pending_emotions: List[Tuple[Dict, Optional[Dict], np.ndarray]],
+        recognized_per_frame: List[List[Dict]]
+    ) -> None:
+        """Classify all queued crops in one pass and copy emotions onto faces and their tracks."""
+        if pending_emotions and self.face_recognizer.analyze_emotion:
+            emotions = self.face_recognizer.classify_emotions(
+                [crop for _, _, crop in pending_emotions])
+            for (face, identity, _), emotion_data in zip(pending_emotions, emotions):
+                if not emotion_data:
+                    continue
+                fields = {
+                    "emotion_label": emotion_data.get('emotion'),
+                    "emotion_confidence": emotion_data.get('confidence'),
+                }
+                face.update(fields)
+                if identity is not None:
+                    identity.update(fields)
+
+        for recognized_faces in recognized_per_frame:
+            for face in recognized_faces:
+                identity = face.pop("_identity", None)
+                if identity is not None:
+                    face["emotion_label"] = identity.get("emotion_label")
+                    face["emotion_confidence"] = identity.get("emotion_confidence")
+
     def _scale_face_coordinates(
         self,
         face: Dict,
@@ -149,8 +323,9 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         face: Dict,
         video_path: str,
         job_id: str,
-        scale_factor: float
-    ) -> None:
+        scale_factor: float,
+        source_frame=None
+    ) -> bool:
         """" Track unknown face  and check by face name, if we save it before or it's the first time to save json and image file for user to label after the video is indexed """
         face_id = face['name']
         appearance_data = {
@@ -164,25 +339,21 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         # Case 1: the face is "Unknown_001" and we don't have in saved_unknown_faces yet
         # Step 1: Build the appearance data including the timestamps, the face coordinates, job_id (most important to use later on for user face labelling)
         # Step 2: Because we scaled down to video frame, we need to get face coordinates and face image in the original to train the DeepFace model with high quality
-        # face images, we use the scale_factor that we pass when we scale down the frame, revert back to original frame and save it the image using _load_original_frame and opencv
+        # face images, we use the scale_factor that we pass when we scale down the frame, revert back to original frame (the full-resolution
+        # source_frame kept by the frame extractor) and save the image using opencv
         # save a json file that we can keep track of the face data, so later on the user can label the face once per video and we'll get all scenes where the face recognized
         # over FaceRecognizer._recognize_or_cluster, we're recognize the face or cluster the unknown using the embedding
          
+        # Later appearances are buffered in memory and written by _flush_appearances;
+        # a JSON file deleted meanwhile is saved again there with every buffered appearance
         if face_id not in self.saved_unknown_faces:
             result = self._save_first_occurrence(
                 frame, timestamp_ms, frame_idx, face, video_path,
-                appearance_data, job_id, scale_factor
+                appearance_data, job_id, scale_factor, source_frame
             )
         else:
-            json_path = self.saved_unknown_faces[face_id]["json_path"]
-            if os.path.exists(json_path):
-             result = self._update_appearances(face_id, appearance_data)
-            else:
-                # JSON file was deleted, treat as first occurrence
-                result = self._save_first_occurrence(
-                    frame, timestamp_ms, frame_idx, face, video_path,
-                    appearance_data, job_id, scale_factor
-                )
+            result = self._update_appearances(face_id, appearance_data)
+
         return result
     
     def _save_first_occurrence(
@@ -194,17 +365,18 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         video_path: str,
         appearance_data: Dict,
         job_id: str,
-        scale_factor: float
-    ) -> None:
+        scale_factor: float,
+        source_frame=None
+    ) -> bool:
         face_id = face['name']
         top, right, bottom, left = face['location']
 
-        # Load original frame
-        original_frame = self._load_original_frame(
-            frame, video_path, timestamp_ms)
+        # Crop from the full-resolution copy of the analysed frame
+        original_frame = self._load_original_frame(source_frame)
         if original_frame is None:
-            logger.warning(
-                f"Using scaled frame for {face_id} - original frame unavailable")
+            if scale_factor != 1.0:
+                logger.warning(
+                    f"Using scaled frame for {face_id} - original frame unavailable")
             original_frame = frame
             scale_factor = 1.0
 
@@ -249,123 +421,228 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
             if not os.access(self.unknown_faces_dir, os.W_OK):
                 logger.error(
                     f"No write permission for {self.unknown_faces_dir}")
-                return
-
-            cv2.imwrite(str(image_path), face_image, [
-                        cv2.IMWRITE_JPEG_QUALITY, 85])
-
-            metadata = {
-                "face_id": face_id,
-                "job_id": job_id,
-                "image_file": image_path.name,
-                "json_file": json_path.name,
-                "image_hash": hashlib.md5(face_image.tobytes()).hexdigest(),
-                "created_at": datetime.now().isoformat(),
-                "video_path": video_path,
-                "video_name": Path(video_path).name,
-                "all_appearances": [appearance_data],
-                "frame_idx": frame_idx,
-                "total_appearances": 1
-            }
-
-            json_path.write_text(json.dumps(
-                metadata, indent=2, ensure_ascii=False))
+                return False
+
+            with self._store_lock:
+                cv2.imwrite(str(image_path), face_image, [
+                            cv2.IMWRITE_JPEG_QUALITY, 85])
+
+                metadata = {
+                    "face_id": face_id,
+                    "job_id": job_id,
+                    "image_file": image_path.name,
+                    "json_file": json_path.name,
+                    "image_hash": hashlib.md5(face_image.tobytes()).hexdigest(),
+                    "created_at": datetime.now().isoformat(),
+                    "video_path": video_path,
+                    "video_name": Path(video_path).name,
+                    "embedding_file": f"{UnknownFaceEmbeddingIndex.EMBEDDINGS_DIR}/{base_filename}.npy",
+                    "all_appearances": [appearance_data],
+                    "frame_idx": frame_idx,
+                    "total_appearances": 1
+                }
 
-            self.saved_unknown_faces[face_id] = {
-                "json_path": str(json_path),
-                "image_path": str(image_path),
-                "appearances": [appearance_data]
-            }
+                self._write_metadata(json_path, metadata)
+                self._record_job_artifact(base_filename)
+                # Written after the JSON, which marks the embedding as live
+                self._save_embedding(base_filename, face.get('embedding'))
+
+                self.saved_unknown_faces[face_id] = {
+                    "base_filename": base_filename,
+                    "json_path": str(json_path),
+                    "image_path": str(image_path),
+                    "metadata": metadata,
+                    "appearances": metadata["all_appearances"]
+                }
+                self._pending_appearances.discard(face_id)
             return True
         except Exception as e:
             logger.error(f"Failed to save unknown face {face_id}: {e}")
             return False
 
-    def _update_appearances(self, face_id: str, appearance_data: Dict) -> None:
-        """" Update exciting unknown face appearances """
-        json_path = self.saved_unknown_faces[face_id]["json_path"]
+    def _update_appearances(self, face_id: str, appearance_data: Dict) -> bool:
+        """" Record a new appearance of an existing unknown face in memory until the next flush """
+        metadata = self.saved_unknown_faces[face_id]["metadata"]
+        metadata["all_appearances"].append(appearance_data)
+        metadata["total_appearances"] = len(metadata["all_appearances"])
+        metadata["last_updated"] = datetime.now().isoformat()
+        metadata["last_appearance"] = appearance_data
+        self._pending_appearances.add(face_id)
+        return True
+
+    def _flush_appearances(self) -> None:
+        """" Write unknown faces with buffered appearances back to their JSON files """
+        with self._store_lock:
+            self._last_appearance_flush = time.monotonic()
+            for face_id in list(self._pending_appearances):
+                saved = self.saved_unknown_faces.get(face_id)
+                if not saved:
+                    continue
+                json_path = Path(saved["json_path"])
+                try:
+                    if json_path.exists():
+                        self._write_metadata(json_path, saved["metadata"])
+                    else:
+                        self._resave_first_occurrence(face_id, saved)
+                except Exception as e:
+                    logger.error(f"Failed to update appearances for {face_id}: {e}")
+            self._pending_appearances.clear()
 
+            if self.face_recognizer:
+                self.face_recognizer.flush_unknown_store()
+
+    def _resave_first_occurrence(self, face_id: str, saved: Dict) -> None:
+        """" Save an unknown face whose JSON was deleted between flushes again, keeping its buffered appearances """
+        logger.warning(f"Unknown face file {saved['json_path']} was removed, saving {face_id} again")
+        if not os.path.exists(saved["image_path"]):
+            logger.warning(f"Image of unknown face {face_id} was removed too, saving its appearances only")
+
+        metadata = saved["metadata"]
+        metadata["created_at"] = datetime.now().isoformat()
+        self._write_metadata(Path(saved["json_path"]), metadata)
+        self._record_job_artifact(saved["base_filename"])
+        if self.face_recognizer:
+            self._save_embedding(
+                saved["base_filename"], self.face_recognizer.unknown_face_embedding(face_id))
+
+    @staticmethod
+    def _write_metadata(json_path: Path, metadata: Dict) -> None:
+        """" Replace the unknown face JSON atomically so readers never see a partial file """
+        tmp_path = json_path.with_name(f".{json_path.name}.tmp")
+        tmp_path.write_text(json.dumps(metadata, indent=2, ensure_ascii=False))
+        os.replace(tmp_path, json_path)
+
+    def _save_embedding(self, base_filename: str, embedding: Optional[np.ndarray]) -> None:
+        """" Store the face embedding next to its JSON so labelling can rematch without re-analysis """
+        if embedding is None or not self.embedding_index:
+            return
         try:
-            metadata = json.loads(Path(json_path).read_text())
-            metadata.setdefault("all_appearances", []).append(appearance_data)
-            metadata["total_appearances"] = len(metadata["all_appearances"])
-            metadata["last_updated"] = datetime.now().isoformat()
-            metadata["last_appearance"] = appearance_data
-
-            Path(json_path).write_text(json.dumps(
-                metadata, indent=2, ensure_ascii=False))
-            self.saved_unknown_faces[face_id]["appearances"].append(
-                appearance_data)
-            return True
-
+            self.embedding_index.save(base_filename, embedding)
         except Exception as e:
-            logger.error(f"Failed to update appearances for {face_id}: {e}")
-            return False
+            logger.warning(f"Failed to save embedding for {base_filename}: {e}")
 
-    def _load_original_frame(self, frame: np.ndarray, video_path: str, timestamp_ms: int) -> Optional[np.ndarray]:
-        """" Load original frame to save the unknown face image with high resolution """
+    def _save_cluster_embeddings(self) -> None:
+        """" Replace first-occurrence embeddings with the final cluster centroids of this job """
+        if not self.face_recognizer:
+            return
+        with self._store_lock:
+            for face_id, saved in self.saved_unknown_faces.items():
+                centroid = self.face_recognizer.unknown_face_embedding(face_id)
+                if centroid is not None and os.path.exists(saved["json_path"]):
+                    self._save_embedding(saved["base_filename"], centroid)
+
+    def rematch_unknown_faces(self, names: Optional[List[str]] = None) -> List[Dict]:
+        """Match every stored unknown face embedding against the known faces (optionally only `names`)."""
+        with self._store_lock:
+            if not self.face_recognizer or not self.embedding_index:
+                return []
+            return self.face_recognizer.rematch_unknown_faces(self.embedding_index, names)
+
+    def _load_original_frame(self, source_frame) -> Optional[np.ndarray]:
+        """" Materialise the full-resolution frame kept by the extractor to save the unknown face image with high resolution """
+        if source_frame is None:
+            return None
         try:
-            cap = cv2.VideoCapture(video_path)
-            cap.set(cv2.CAP_PROP_POS_MSEC, timestamp_ms)
-            ret, original_frame = cap.read()
-            cap.release()
-
-            if not ret or original_frame is None:
-                logger.warning(
-                    f"Could not read original frame at {timestamp_ms}ms")
-                original_frame = frame
-            else:
-                return original_frame
+            return source_frame.to_ndarray()
         except Exception as e:
             logger.error(f"Error reading original frame: {e}")
-            original_frame = frame
-            return original_frame
+            return None
 
     def _cleanup_previous_run(self) -> None:
         """" Clean previous unknown faces using previous job_id, if the video processing job failed and re-run, delete previous jobs unknown saved faces"""
-        removed = 0
-        for json_file in self.unknown_faces_dir.glob("*.json"):
-            try:
-                metadata = json.loads(json_file.read_text())
-                if (metadata.get("video_path") == self.current_video_path and
-                        metadata.get("job_id") == self.current_job_id):
+        self._index_existing_unknown_faces()
 
-                    json_file.unlink()
-                    image_file = json_file.with_suffix(".jpg")
-                    if image_file.exists():
-                        image_file.unlink()
-                    removed += 1
+        manifest_path = self._job_manifest_path(self.current_video_path, self.current_job_id)
+        if not manifest_path.exists():
+            return
 
-            except Exception as e:
-                logger.warning(f"Cleanup failed for {json_file}: {e}")
-                json_file.unlink(missing_ok=True)
+        removed = 0
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable unknown face manifest {manifest_path}: {e}")
+            manifest = {}
+
+        for base_filename in manifest.get("files", []):
+            json_file = self.unknown_faces_dir / f"{base_filename}.json"
+            if json_file.exists():
+                removed += 1
+            json_file.unlink(missing_ok=True)
+            (self.unknown_faces_dir / f"{base_filename}.jpg").unlink(missing_ok=True)
+            if self.embedding_index:
+                self.embedding_index.embedding_path(base_filename).unlink(missing_ok=True)
+        manifest_path.unlink(missing_ok=True)
 
         if removed:
             logger.info(
                 f"Cleaned {removed} previous unknown faces for job {self.current_job_id}")
 
+    def _job_manifest_path(self, video_path: str, job_id: str) -> Path:
+        key = hashlib.md5(f"{video_path}{job_id}".encode()).hexdigest()
+        return self.unknown_faces_dir / JOB_INDEX_DIR / f"{key}.json"
+
+    def _record_job_artifact(self, base_filename: str) -> None:
+        """" Add a saved unknown face to the manifest of the current job """
+        if base_filename in self._job_artifacts:
+            return
+        self._job_artifacts.append(base_filename)
+
+        manifest_path = self._job_manifest_path(self.current_video_path, self.current_job_id)
+        try:
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            self._write_metadata(manifest_path, {
+                "video_path": self.current_video_path,
+                "job_id": self.current_job_id,
+                "files": self._job_artifacts
+            })
+        except Exception as e:
+            logger.warning(f"Failed to update unknown face manifest {manifest_path}: {e}")
+
+    def _index_existing_unknown_faces(self) -> None:
+        """" Build job manifests once for unknown faces saved before manifests existed """
+        index_dir = self.unknown_faces_dir / JOB_INDEX_DIR
+        marker = index_dir / JOB_INDEX_MARKER
+        if marker.exists():
+            return
+
+        index_dir.mkdir(parents=True, exist_ok=True)
+        jobs: Dict[Path, Dict] = {}
+        for json_file in self.unknown_faces_dir.glob("*.json"):
+            try:
+                metadata = json.loads(json_file.read_text())
+            except Exception as e:
+                logger.warning(f"Skipping unreadable unknown face {json_file}: {e}")
+                continue
+            video_path, job_id = metadata.get("video_path"), metadata.get("job_id")
+            if not video_path or not job_id:
+                continue
+            manifest_path = self._job_manifest_path(video_path, job_id)
+            jobs.setdefault(manifest_path, {
+                "video_path": video_path, "job_id": job_id, "files": []
+            })["files"].append(json_file.stem)
+
+        for manifest_path, manifest in jobs.items():
+            if manifest_path.exists():
+                existing = json.loads(manifest_path.read_text()).get("files", [])
+                manifest["files"] = sorted(set(existing) | set(manifest["files"]))
+            self._write_metadata(manifest_path, manifest)
+
+        marker.touch()
+        logger.info(f"Indexed unknown faces of {len(jobs)} previous jobs in {index_dir}")
+
     def _load_custom_face_metadata(self, name: str) -> Optional[Dict]:
-        """Load metadata.json from the known face's folder in FACE_DIR, if present.
+        """Return the metadata.json from the known face's folder in FACE_DIR, if present.
 
         Expected structure:
             <FACE_DIR>/<name>/metadata.json
 
-        Returns the parsed dict on success, or None if the file doesn't exist or
+        Served from the known face gallery, which reloads the file only when
+        it changes on disk. Returns None if the file doesn't exist or
         cannot be read.
         """
-        faces_dir = Path(os.getenv("FACES_DIR", ".faces"))  
-        metadata_file = faces_dir / name / "metadata.json"
-
-        if not metadata_file.exists():
-            return None
-
-        try:
-            data = json.loads(metadata_file.read_text(encoding="utf-8"))
-            logger.debug(f"Loaded custom metadata for '{name}' from {metadata_file}")
-            return data
-        except Exception as e:
-            logger.warning(f"Failed to load metadata.json for '{name}': {e}")
+        if not self.face_recognizer:
             return None
+        return self.face_recognizer.gallery.get_metadata(name)
 
     def get_results(self) -> PluginResult:
         """" Get all faces back"""
@@ -412,18 +689,28 @@ class FaceRecognitionPlugin(AnalyzerPlugin):
         }
     def cleanup(self) -> None:
         """Clean up any data from previous processing job."""
+        if any(self.tracking_stats.values()):
+            logger.info(
+                f"Face tracking: {self.tracking_stats['identified']} faces identified, "
+                f"{self.tracking_stats['propagated']} propagated along tracks")
+        self.face_tracker.reset()
+        self._flush_appearances()
+        self._save_cluster_embeddings()
         if self.face_recognizer:
+            self.face_recognizer.flush_unknown_store()
             self.face_recognizer.reset_unknown_registry()
         self.saved_unknown_faces  = {}
         self.all_faces = []
         
     def cleanup_models(self) -> None:
         try:
-            if self.face_recognizer:
-                self.face_recognizer.reset_unknown_registry()
+            with self._store_lock:
+                if self.face_recognizer:
+                    self.face_recognizer.flush_unknown_store()
+                    self.face_recognizer.reset_unknown_registry()
 
-                del self.face_recognizer
-                self.face_recognizer = None
+                    del self.face_recognizer
+                    self.face_recognizer = None
 
         except Exception as e:
             logger.error(f"Failed to cleanup FaceRecognitionPlugin models: {e}")
\ No newline at end of file
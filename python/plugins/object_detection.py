@@ -1,19 +1,37 @@
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
+import time
 import numpy as np
+import cv2
 import torch
 from ultralytics import YOLO
 
 from plugins.base import AnalyzerPlugin, FrameAnalysis, PluginResult
 from services.logger import get_logger
 from core.config import AnalysisConfig
+from utils.batching import AdaptiveBatchSize
 import os 
 
 logger = get_logger(__name__)
 
+# Letterbox padding colour and stride used by ultralytics
+LETTERBOX_COLOR = 114
+LETTERBOX_STRIDE = 32
+
+# Rough peak memory per 640px frame during a YOLOv8s forward pass
+YOLO_BYTES_PER_FRAME = 3 * 640 * 640 * 4 * 20
+
+# (gain, (pad_left, pad_top)) mapping letterboxed coordinates back to the frame
+LetterboxGeometry = Tuple[float, Tuple[int, int]]
+
+# Consecutive detections with an unchanged set of tracks before frames may be skipped
+STABLE_TRACK_FRAMES = 2
+
 
 class ObjectDetectionPlugin(AnalyzerPlugin):
     """A plugin for detecting objects in video frames using YOLO."""
 
+    provides = ('objects',)
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.yolo_model: Optional[YOLO] = None
@@ -25,6 +43,27 @@ class ObjectDetectionPlugin(AnalyzerPlugin):
 
         # If you're running this script over Apple computer with M Chips
         self.batch_size: int = 8 if self.config.get("device") == "mps" else 1
+        self.batch_sizer = AdaptiveBatchSize(
+            max_batch_size=32,
+            bytes_per_item=YOLO_BYTES_PER_FRAME,
+            initial=self.batch_size
+        )
+
+        # Letterbox geometry and padded input buffer, reused while the frame size doesn't change
+        self._letterbox_key: Optional[Tuple[int, int]] = None
+        self._letterbox_geometry: Optional[LetterboxGeometry] = None
+        self._letterbox_shape: Tuple[int, int] = (0, 0)
+        self._letterbox_buffer: Optional[np.ndarray] = None
+
+        # Optional ByteTrack/BoT-SORT tracking with per-track time ranges
+        self.enable_tracking: bool = bool(self.config.get("object_tracking", False))
+        self.tracker_config: str = self.config.get("object_tracker", "bytetrack.yaml")
+        self.track_max_skip: int = int(self.config.get("object_track_max_skip", 0))
+        self.tracks: Dict[int, Dict] = {}
+        self._last_objects: List[Dict] = []
+        self._last_track_ids: set = set()
+        self._stable_count = 0
+        self._skipped_in_row = 0
 
     def load_models(self) -> None:
         """Initialize the YOLO model."""
@@ -41,71 +80,240 @@ class ObjectDetectionPlugin(AnalyzerPlugin):
 
     
     def setup(self, video_path, job_id) -> None:
-        return None
+        self.tracks = {}
+        self._last_objects = []
+        self._last_track_ids = set()
+        self._stable_count = 0
+        self._skipped_in_row = 0
+
+        # Trackers persist across track() calls, so start every video fresh
+        predictor = getattr(self.yolo_model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
 
     def analyze_frame(self, frame: np.ndarray, frame_analysis: FrameAnalysis, video_path: str) -> FrameAnalysis:
-        detections_results = self._run_object_detection([frame])
+        return self.analyze_batch([frame], [frame_analysis], video_path)[0]
+
+    def analyze_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str
+    ) -> List[FrameAnalysis]:
+        """Detect objects in chunks sized by measured latency and free memory.
+
+        In tracking mode the chunk is tracked in frame order, and with
+        `object_track_max_skip` set, frames inside a stable set of tracks
+        reuse the previous objects instead of running detection.
+        """
+        device = self.config.get("device", "cpu")
+        sequential = self.enable_tracking and self.track_max_skip > 0
+        start = 0
+        while start < len(frames):
+            if sequential and self._can_skip_detection():
+                frame_analysis = frame_analyses[start]
+                frame_analysis['objects'] = [
+                    {**obj, "bbox": dict(obj["bbox"])} for obj in self._last_objects]
+                self._skipped_in_row += 1
+                self.gated_frames += 1
+                self._record_tracks(frame_analysis)
+                start += 1
+                continue
+
+            size = 1 if sequential else self.batch_sizer.next_size(len(frames) - start, device)
+            chunk = frames[start:start + size]
+
+            started_at = time.perf_counter()
+            detections_results, geometry = self._run_object_detection(chunk)
+            self.batch_sizer.record(len(chunk), time.perf_counter() - started_at)
+
+            for i, frame_analysis in enumerate(frame_analyses[start:start + size]):
+                detections = detections_results[i] if i < len(detections_results) else None
+                frame_analysis['objects'] = self._build_frame_objects(
+                    detections, float(frame_analysis.get('scale_factor', 1.0)), geometry)
+                if self.enable_tracking:
+                    self._observe_tracks(frame_analysis)
+            start += size
+
+        return frame_analyses
+
+    def _can_skip_detection(self) -> bool:
+        return (
+            bool(self._last_objects)
+            and self._stable_count >= STABLE_TRACK_FRAMES
+            and self._skipped_in_row < self.track_max_skip
+        )
 
-        scale_factor = float(frame_analysis.get('scale_factor', 1.0))
+    def _observe_tracks(self, frame_analysis: FrameAnalysis) -> None:
+        """Update track stability after a detected frame and record its tracks."""
+        objects = frame_analysis['objects']
+        track_ids = {obj["track_id"] for obj in objects if "track_id" in obj}
+        if track_ids and track_ids == self._last_track_ids:
+            self._stable_count += 1
+        else:
+            self._stable_count = 0
+        self._last_track_ids = track_ids
+        self._last_objects = objects
+        self._skipped_in_row = 0
+        self._record_tracks(frame_analysis)
 
+    def _record_tracks(self, frame_analysis: FrameAnalysis) -> None:
+        """Extend the time range of every track present in the frame."""
+        start_ms = frame_analysis.get('start_time_ms', 0)
+        end_ms = frame_analysis.get('end_time_ms', start_ms)
+        for obj in frame_analysis['objects']:
+            track_id = obj.get("track_id")
+            if track_id is None:
+                continue
+            track = self.tracks.get(track_id)
+            if track is None:
+                self.tracks[track_id] = {
+                    "track_id": track_id,
+                    "label": obj["label"],
+                    "start_time_ms": start_ms,
+                    "end_time_ms": end_ms,
+                    "frames": 1,
+                    "max_confidence": obj["confidence"],
+                }
+                continue
+            track["start_time_ms"] = min(track["start_time_ms"], start_ms)
+            track["end_time_ms"] = max(track["end_time_ms"], end_ms)
+            track["frames"] += 1
+            track["max_confidence"] = max(track["max_confidence"], obj["confidence"])
+
+    def _build_frame_objects(
+        self,
+        detections,
+        scale_factor: float,
+        geometry: Optional[LetterboxGeometry] = None
+    ) -> List[Dict[str, Union[str, float, Dict[str, float]]]]:
+        """Convert YOLO boxes into objects scaled back to the original frame."""
         frame_objects: List[Dict[str,
                                  Union[str, float, Dict[str, float]]]] = []
-        if detections_results and self.yolo_model is not None:
-            detections = detections_results[0]
-            if detections.boxes:
-                for det in detections.boxes:
-                    label = self.yolo_model.names[int(det.cls[0])]
-                    confidence = float(det.conf[0]) * 100
-
-                    x1, y1, x2, y2 = det.xyxy[0].tolist()
-
-                    x1_orig = x1 * scale_factor
-                    y1_orig = y1 * scale_factor
-                    x2_orig = x2 * scale_factor
-                    y2_orig = y2 * scale_factor
-
-                    x = x1_orig
-                    y = y1_orig
-                    width = x2_orig - x1_orig
-                    height = y2_orig - y1_orig
-
-                    if width < 20 or height < 20:
-                        continue
-
-                    frame_objects.append({
-                        "label": label,
-                        "confidence": confidence,
-                        "bbox": {
-                            "x": x,
-                            "y": y,
-                            "width": width,
-                            "height": height
-                        }
-                    })
-
-        frame_analysis['objects'] = frame_objects
-        return frame_analysis
-
-    def _run_object_detection(self, frames: List[np.ndarray]) -> List:
-        """Run YOLO object detection on a batch of frames."""
-        if self.yolo_model is None:
-            return []
+        if detections is None or self.yolo_model is None or not detections.boxes:
+            return frame_objects
+
+        for det in detections.boxes:
+            track_id = int(det.id[0]) if det.id is not None else None
+            label = self.yolo_model.names[int(det.cls[0])]
+            confidence = float(det.conf[0]) * 100
+
+            x1, y1, x2, y2 = det.xyxy[0].tolist()
+            if geometry is not None:
+                # Boxes of a pre-letterboxed batch are in letterbox coordinates
+                gain, (pad_left, pad_top) = geometry
+                x1, x2 = (x1 - pad_left) / gain, (x2 - pad_left) / gain
+                y1, y2 = (y1 - pad_top) / gain, (y2 - pad_top) / gain
+
+            x1_orig = x1 * scale_factor
+            y1_orig = y1 * scale_factor
+            x2_orig = x2 * scale_factor
+            y2_orig = y2 * scale_factor
+
+            x = x1_orig
+            y = y1_orig
+            width = x2_orig - x1_orig
+            height = y2_orig - y1_orig
+
+            if width < 20 or height < 20:
+                continue
+
+            frame_object = {
+                "label": label,
+                "confidence": confidence,
+                "bbox": {
+                    "x": x,
+                    "y": y,
+                    "width": width,
+                    "height": height
+                }
+            }
+            if track_id is not None:
+                frame_object["track_id"] = track_id
+            frame_objects.append(frame_object)
+
+        return frame_objects
+
+    def _run_object_detection(
+        self,
+        frames: List[np.ndarray]
+    ) -> Tuple[List, Optional[LetterboxGeometry]]:
+        """Run YOLO object detection on a batch of frames.
 
+        Frames of one size are letterboxed here into a reused buffer and passed
+        as one tensor, so ultralytics doesn't letterbox each frame again; the
+        returned geometry maps the boxes back. Mixed sizes go through the
+        regular per-image preprocessing.
+        """
+        if self.yolo_model is None or not frames:
+            return [], None
+
+        shapes = {frame.shape for frame in frames}
+        geometry = None
+        if len(shapes) == 1:
+            source, geometry = self._letterbox_batch(frames)
+        else:
+            source = frames
+
+        options = dict(
+            device=self.config.get("device"),
+            imgsz=self.image_size,
+            batch=len(frames),
+            conf=self.model_confidence,
+            iou=self.model_iou,
+            half=False,
+            augment=False,
+            verbose=False,
+        )
         with torch.no_grad():
-            return self.yolo_model.predict(
-                frames,
-                device=self.config.get("device"),
-                imgsz=self.image_size,
-                batch=self.batch_size,
-                conf=self.model_confidence,
-                iou=self.model_iou,
-                half=False,
-                augment=False,
-                verbose=False,
-            )
+            if self.enable_tracking:
+                # Results of a batch update the same tracker in frame order
+                results = self.yolo_model.track(
+                    source, persist=True, tracker=self.tracker_config, **options)
+            else:
+                results = self.yolo_model.predict(source, **options)
+        return results, geometry
+
+    def _letterbox_batch(self, frames: List[np.ndarray]) -> Tuple[torch.Tensor, LetterboxGeometry]:
+        """Letterbox same-sized BGR frames into an RGB float tensor (B, 3, H, W)."""
+        height, width = frames[0].shape[:2]
+        if self._letterbox_key != (height, width):
+            gain = min(self.image_size / height, self.image_size / width)
+            new_w, new_h = int(round(width * gain)), int(round(height * gain))
+            # Minimal padding to the model stride, as ultralytics does for rectangular input
+            padded_w = -(-new_w // LETTERBOX_STRIDE) * LETTERBOX_STRIDE
+            padded_h = -(-new_h // LETTERBOX_STRIDE) * LETTERBOX_STRIDE
+            pad_left, pad_top = (padded_w - new_w) // 2, (padded_h - new_h) // 2
+
+            self._letterbox_key = (height, width)
+            self._letterbox_geometry = (gain, (pad_left, pad_top))
+            self._letterbox_shape = (new_w, new_h)
+            self._letterbox_buffer = None
+        else:
+            gain, (pad_left, pad_top) = self._letterbox_geometry
+            new_w, new_h = self._letterbox_shape
+
+        buffer = self._letterbox_buffer
+        if buffer is None or buffer.shape[0] < len(frames):
+            padded_h = -(-new_h // LETTERBOX_STRIDE) * LETTERBOX_STRIDE
+            padded_w = -(-new_w // LETTERBOX_STRIDE) * LETTERBOX_STRIDE
+            buffer = np.full((len(frames), padded_h, padded_w, 3), LETTERBOX_COLOR, dtype=np.uint8)
+            self._letterbox_buffer = buffer
+
+        # Only the image area is rewritten; the padding keeps its colour
+        for i, frame in enumerate(frames):
+            buffer[i, pad_top:pad_top + new_h, pad_left:pad_left + new_w] = cv2.resize(
+                frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        batch = np.ascontiguousarray(buffer[:len(frames), ..., ::-1].transpose(0, 3, 1, 2))
+        tensor = torch.from_numpy(batch).to(self.config.get("device", "cpu")).float().div_(255.0)
+        return tensor, self._letterbox_geometry
 
     def get_results(self) -> PluginResult:
-        return None
+        """Per-track time ranges when tracking is enabled."""
+        if not self.enable_tracking:
+            return None
+        return sorted(self.tracks.values(), key=lambda t: (t["start_time_ms"], t["track_id"]))
 
     def get_summary(self) -> PluginResult:
         return None
@@ -8,6 +8,9 @@ from core.config import AnalysisConfig
 class ShotTypePlugin(AnalyzerPlugin):
     """Video shot type classification based on face coverage."""
 
+    provides = ('shot_type',)
+    requires = ('faces',)
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.close_up_threshold = 0.3
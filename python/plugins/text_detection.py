@@ -1,5 +1,5 @@
 from .base import AnalyzerPlugin, FrameAnalysis, PluginResult
-from typing import Dict, Optional, Union, List
+from typing import Dict, Optional, Union, List, Tuple
 import numpy as np
 import cv2
 from core.config import AnalysisConfig
@@ -7,19 +7,47 @@ import easyocr
 import torch
 
 from services.logger import get_logger
+from utils.frame_views import get_view
 
 logger = get_logger(__name__)
 
+# Side of the square cells the text-presence check measures edge density in
+TEXT_CELL_SIZE = 32
+# Width the frame is reduced to for the text-presence check
+TEXT_CHECK_WIDTH = 640
+# Size regions are reduced to when comparing them with the previous frame's
+REGION_SIGNATURE_SIZE = (32, 8)
+# Pixels a region's corners may move and still count as the same region
+REGION_POSITION_TOLERANCE = 4
+# Mean absolute grey level difference below which a region is unchanged
+REGION_PIXEL_TOLERANCE = 8.0
+
+# (x_min, y_min, x_max, y_max) of a text region in the OCR frame
+RegionRect = Tuple[int, int, int, int]
+
 
 class TextDetectionPlugin(AnalyzerPlugin):
     """Analyzes frames to detect and recognize text using EasyOCR."""
 
+    provides = ('detected_text',)
+
     def __init__(self, config: AnalysisConfig):
         super().__init__(config)
         self.reader: Optional[easyocr.Reader] = None
+        # OCR runs on the shared "half" frame view
         self.text_scale = 0.5
         self.min_confidence: float = 0.3
         self.use_gpu = self.config.get("device") != 'cpu'
+        # Edge density some cell must reach before CRAFT runs; 0 always runs it
+        self.edge_density_threshold: float = self.config.get(
+            "ocr_edge_density_threshold", 0.0)
+        # CRAFT character score a region needs to be sent to recognition
+        self.text_threshold: float = self.config.get(
+            "ocr_text_threshold", self.min_confidence)
+        # Regions recognised on the previous frame, reused while their pixels don't change
+        self.region_cache: List[Dict] = []
+        self.recognized_regions = 0
+        self.reused_regions = 0
 
     def load_models(self) -> None:
         """Initialize the EasyOCR reader."""
@@ -35,86 +63,280 @@ class TextDetectionPlugin(AnalyzerPlugin):
             self.reader = None
             
     def setup(self, video_path: str, job_id: str) -> None:
-        return None
+        self.region_cache = []
+        self.recognized_regions = 0
+        self.reused_regions = 0
     
     def analyze_frame(self, frame: np.ndarray, frame_analysis: FrameAnalysis, video_path: str) -> FrameAnalysis:
-        """Detect text in a single frame with optimizations."""
+        """Detect text in a single frame."""
+        return self.analyze_batch([frame], [frame_analysis], video_path)[0]
+
+    def analyze_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str
+    ) -> List[FrameAnalysis]:
+        """
+        Detect text in the batch, falling back to one frame at a time on errors.
+
+        A frame whose own detection fails gets an empty `detected_text`, so
+        one bad frame neither loses the rest of the batch nor the key.
+        """
         if self.reader is None:
-            return frame_analysis
+            return frame_analyses
 
+        counters = (self.gated_frames, self.recognized_regions, self.reused_regions)
         try:
-            scale_factor = float(frame_analysis.get('scale_factor', 1.0))
-
-            if self.text_scale != 1.0:
-                small_frame = cv2.resize(
-                    frame,
-                    (0, 0),
-                    fx=self.text_scale,
-                    fy=self.text_scale,
-                    interpolation=cv2.INTER_LINEAR
-                )
-            else:
-                small_frame = frame
-
-            frame_rgb = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-            results = self.reader.readtext(
-                frame_rgb,
-                detail=1,
-                paragraph=False,
-                min_size=10,
-                text_threshold=self.min_confidence,
-                low_text=self.min_confidence,
-                link_threshold=0.4,
-                canvas_size=2560,
-                mag_ratio=1.0
-            )
+            return self._detect_batch(frames, frame_analyses)
+        except Exception as e:
+            logger.error(f"Batched text detection failed, detecting frame by frame: {e}")
+            # The frames are counted again as they are retried
+            self.gated_frames, self.recognized_regions, self.reused_regions = counters
 
-            if not results:
+        for frame, frame_analysis in zip(frames, frame_analyses):
+            try:
+                self._detect_batch([frame], [frame_analysis])
+            except Exception as e:
+                logger.error(f"Error during text detection: {e}")
                 frame_analysis['detected_text'] = []
-                return frame_analysis
-
-            detected_texts: List[Dict[str, Union[str,
-                                                 float, List[List[int]], Dict[str, int]]]] = []
-            scale_inverse = 1.0 / self.text_scale
-
-            for (bbox, text, prob) in results:
-                if prob < self.min_confidence:
-                    continue
-
-                scaled_bbox = [
-                    [int(p[0] * scale_inverse * scale_factor),
-                     int(p[1] * scale_inverse * scale_factor)]
-                    for p in bbox
-                ]
-
-                x_coords = [p[0] for p in scaled_bbox]
-                y_coords = [p[1] for p in scaled_bbox]
-
-                x_min = min(x_coords)
-                y_min = min(y_coords)
-                x_max = max(x_coords)
-                y_max = max(y_coords)
-
-                detected_texts.append({
-                    'text': text,
-                    'confidence': float(prob) * 100,
-                    'bounding_box': scaled_bbox,
-                    'bbox': {
-                        'x': x_min,
-                        'y': y_min,
-                        'width': x_max - x_min,
-                        'height': y_max - y_min
-                    }
-                })
 
-            frame_analysis['detected_text'] = detected_texts
+        return frame_analyses
 
-        except Exception as e:
-            logger.error(f"Error during text detection: {e}")
+    def _detect_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis]
+    ) -> List[FrameAnalysis]:
+        """
+        Detect text in the batch, recognising only frames with text regions.
+
+        Frames without a dense patch of edges are ruled out before the CRAFT
+        detector runs, the remaining frames go through one batched detection
+        call, and recognition only runs on frames where regions were found,
+        and only on regions that changed since the previous frame.
+        """
+        frames_rgb = [get_view(frame, "half_rgb") for frame in frames]
+        frames_gray = [get_view(frame, "half_gray") for frame in frames]
+
+        for frame_analysis in frame_analyses:
             frame_analysis['detected_text'] = []
 
-        return frame_analysis
+        candidates = [i for i, frame_gray in enumerate(frames_gray)
+                      if self._has_text_candidates(frame_gray)]
+        self.gated_frames += len(frames) - len(candidates)
+        if not candidates:
+            return frame_analyses
+
+        # Frames of a video share one size, so they stack into one detector batch
+        horizontal_lists, free_lists = self.reader.detect(
+            np.stack([frames_rgb[i] for i in candidates]),
+            reformat=False,
+            **self._detect_options()
+        )
+
+        for i, horizontal_list, free_list in zip(candidates, horizontal_lists, free_lists):
+            if not horizontal_list and not free_list:
+                self.gated_frames += 1
+                continue
+
+            results = self._recognize_regions(
+                frames_gray[i], horizontal_list, free_list)
+            scale_factor = float(frame_analyses[i].get('scale_factor', 1.0))
+            frame_analyses[i]['detected_text'] = self._build_detected_texts(
+                results, scale_factor)
+
+        return frame_analyses
+
+    def _recognize_regions(
+        self,
+        frame_gray: np.ndarray,
+        horizontal_list: List,
+        free_list: List
+    ) -> List:
+        """
+        Recognise detected regions, reusing the text of unchanged ones.
+
+        Static overlays (logos, watermarks, lower thirds, tickers) sit at the
+        same place with the same pixels for many frames, so a region close to
+        one of the previous frame's with a matching pixel signature keeps its
+        text and only new or changed regions go through the recogniser.
+        """
+        results = []
+        cache = []
+        new_horizontal, new_free = [], []
+
+        regions = [(box, False) for box in horizontal_list] + [(box, True) for box in free_list]
+        for box, is_free in regions:
+            rect = self._region_rect(box, is_free, frame_gray.shape)
+            signature = self._region_signature(frame_gray, rect)
+            cached = self._find_cached_region(rect, signature)
+            if cached is None:
+                (new_free if is_free else new_horizontal).append(box)
+                continue
+
+            bbox = box if is_free else [
+                [rect[0], rect[1]], [rect[2], rect[1]], [rect[2], rect[3]], [rect[0], rect[3]]]
+            results.append((bbox, cached["text"], cached["confidence"]))
+            # Keep the recognised signature so slow changes can't drift past the tolerance
+            cache.append({**cached, "rect": rect})
+            self.reused_regions += 1
+
+        if new_horizontal or new_free:
+            recognized = self.reader.recognize(
+                frame_gray,
+                new_horizontal,
+                new_free,
+                batch_size=len(new_horizontal) + len(new_free),
+                reformat=False,
+                **self._recognize_options()
+            )
+            for bbox, text, prob in recognized:
+                rect = self._region_rect(bbox, True, frame_gray.shape)
+                cache.append({
+                    "rect": rect,
+                    "signature": self._region_signature(frame_gray, rect),
+                    "text": text,
+                    "confidence": prob,
+                })
+            results.extend(recognized)
+            self.recognized_regions += len(recognized)
+
+        self.region_cache = cache
+        return results
+
+    def _find_cached_region(
+        self,
+        rect: RegionRect,
+        signature: Optional[np.ndarray]
+    ) -> Optional[Dict]:
+        """Previous frame region at the same place with the same pixels, if any."""
+        if signature is None:
+            return None
+
+        for cached in self.region_cache:
+            if cached["signature"] is None:
+                continue
+            if max(abs(a - b) for a, b in zip(rect, cached["rect"])) > REGION_POSITION_TOLERANCE:
+                continue
+            if np.abs(signature - cached["signature"]).mean() <= REGION_PIXEL_TOLERANCE:
+                return cached
+        return None
+
+    @staticmethod
+    def _region_rect(box, is_free: bool, shape: Tuple[int, ...]) -> RegionRect:
+        """Axis-aligned rectangle of an EasyOCR box, clipped to the frame."""
+        if is_free:
+            xs = [int(point[0]) for point in box]
+            ys = [int(point[1]) for point in box]
+            x_min, x_max, y_min, y_max = min(xs), max(xs), min(ys), max(ys)
+        else:
+            x_min, x_max, y_min, y_max = (int(value) for value in box)
+
+        height, width = shape[:2]
+        return (max(0, x_min), max(0, y_min), min(width, x_max), min(height, y_max))
+
+    @staticmethod
+    def _region_signature(frame_gray: np.ndarray, rect: RegionRect) -> Optional[np.ndarray]:
+        """Downscaled grey pixels of a region, tolerant to compression noise."""
+        x_min, y_min, x_max, y_max = rect
+        crop = frame_gray[y_min:y_max, x_min:x_max]
+        if crop.size == 0:
+            return None
+        return cv2.resize(crop, REGION_SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _has_text_candidates(self, frame_gray: np.ndarray) -> bool:
+        """
+        Cheap text-presence check: some cell of the frame is dense in edges.
+
+        Text strokes give small areas many strong edges, so the Canny edge
+        density of the densest cell is compared with the threshold; plain
+        scenes and soft gradients fall below it.
+        """
+        if self.edge_density_threshold <= 0:
+            return True
+
+        height, width = frame_gray.shape[:2]
+        if width > TEXT_CHECK_WIDTH:
+            frame_gray = cv2.resize(
+                frame_gray,
+                (TEXT_CHECK_WIDTH, int(height * TEXT_CHECK_WIDTH / width)),
+                interpolation=cv2.INTER_AREA
+            )
+
+        edges = cv2.Canny(frame_gray, 100, 200)
+        rows = edges.shape[0] // TEXT_CELL_SIZE
+        cols = edges.shape[1] // TEXT_CELL_SIZE
+        if rows == 0 or cols == 0:
+            return True
+
+        cells = edges[:rows * TEXT_CELL_SIZE, :cols * TEXT_CELL_SIZE].reshape(
+            rows, TEXT_CELL_SIZE, cols, TEXT_CELL_SIZE)
+        density = np.count_nonzero(cells, axis=(1, 3)) / (TEXT_CELL_SIZE * TEXT_CELL_SIZE)
+        return float(density.max()) >= self.edge_density_threshold
+
+    def _detect_options(self) -> Dict[str, Union[int, float, bool]]:
+        """EasyOCR (CRAFT) text region detection options."""
+        return {
+            "min_size": 10,
+            "text_threshold": self.text_threshold,
+            "low_text": self.min_confidence,
+            "link_threshold": 0.4,
+            "canvas_size": 2560,
+            "mag_ratio": 1.0,
+        }
+
+    def _recognize_options(self) -> Dict[str, Union[int, float, bool]]:
+        """EasyOCR recognition options."""
+        return {
+            "detail": 1,
+            "paragraph": False,
+        }
+
+    def _build_detected_texts(
+        self,
+        results: List,
+        scale_factor: float
+    ) -> List[Dict[str, Union[str, float, List[List[int]], Dict[str, int]]]]:
+        """Map EasyOCR results back to original frame coordinates."""
+        detected_texts: List[Dict[str, Union[str,
+                                             float, List[List[int]], Dict[str, int]]]] = []
+        if not results:
+            return detected_texts
+
+        scale_inverse = 1.0 / self.text_scale
+
+        for (bbox, text, prob) in results:
+            if prob < self.min_confidence:
+                continue
+
+            scaled_bbox = [
+                [int(p[0] * scale_inverse * scale_factor),
+                 int(p[1] * scale_inverse * scale_factor)]
+                for p in bbox
+            ]
+
+            x_coords = [p[0] for p in scaled_bbox]
+            y_coords = [p[1] for p in scaled_bbox]
+
+            x_min = min(x_coords)
+            y_min = min(y_coords)
+            x_max = max(x_coords)
+            y_max = max(y_coords)
+
+            detected_texts.append({
+                'text': text,
+                'confidence': float(prob) * 100,
+                'bounding_box': scaled_bbox,
+                'bbox': {
+                    'x': x_min,
+                    'y': y_min,
+                    'width': x_max - x_min,
+                    'height': y_max - y_min
+                }
+            })
+
+        return detected_texts
 
     def get_results(self) -> PluginResult:
         return None
@@ -124,7 +346,12 @@ class TextDetectionPlugin(AnalyzerPlugin):
     
     def cleanup(self) -> None:
         """Clean up any data from previous processing job."""
-        return None
+        total = self.recognized_regions + self.reused_regions
+        if total:
+            logger.info(
+                f"OCR regions: {self.recognized_regions} recognised, "
+                f"{self.reused_regions} reused unchanged ({self.reused_regions / total:.0%})")
+        self.region_cache = []
     
     def cleanup_models(self) -> None:
         device = self.config.get("device", "cpu")
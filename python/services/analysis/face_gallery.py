@@ -0,0 +1,293 @@
+"""In-memory gallery of known face embeddings."""
+from services.logger import get_logger
+from deepface import DeepFace
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+logger = get_logger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+METADATA_FILE = "metadata.json"
+
+
+class KnownFaceGallery:
+    """
+    Embeddings of every labelled face under the known faces folder.
+
+    The gallery keeps a pre-normalised float32 matrix with one row per face
+    found in the images of `<faces_dir>/<person>/`, and the person label of
+    each row, so a query face is matched with a single matrix-vector product
+    instead of a `DeepFace.find` scan of the folder.
+
+    Embeddings are persisted next to the images (`.gallery_<model>.npz`) and
+    only images that were added or modified since the last build are
+    re-embedded; removed images are dropped from the matrix.
+
+    Embeddings, labels and source paths are published together as one
+    immutable snapshot, so `match` never pairs a new matrix with old labels
+    while a refresh runs on another thread.
+
+    The gallery also caches each person's optional `metadata.json`. Folder
+    and metadata modification times are checked at most every
+    `refresh_interval` seconds, so per-face lookups never touch the
+    filesystem.
+
+    Args:
+        faces_dir (str): Folder with one sub-folder of images per person
+        model (str): DeepFace recognition model used for the embeddings
+        detector_backend (str): DeepFace detector used to crop gallery images
+        refresh_interval (float): Minimum seconds between folder change checks
+    """
+
+    def __init__(
+        self,
+        faces_dir: str,
+        model: str,
+        detector_backend: str,
+        refresh_interval: float = 5.0
+    ):
+        self.faces_dir = faces_dir
+        self.model = model
+        self.detector_backend = detector_backend
+        self.refresh_interval = refresh_interval
+        self.cache_path = Path(faces_dir) / f".gallery_{model}.npz"
+
+        self._snapshot: Tuple[np.ndarray, np.ndarray, np.ndarray] = (
+            np.empty((0, 0), dtype=np.float32),
+            np.empty((0,), dtype=str),
+            np.empty((0,), dtype=str),
+        )
+        self.source_mtimes: Dict[str, float] = {}
+        self.metadata: Dict[str, Dict] = {}
+        self._metadata_mtimes: Dict[str, int] = {}
+
+        self._signature: Optional[Tuple] = None
+        self._last_check = 0.0
+        # Analysis jobs and face rematch requests may refresh concurrently
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._snapshot[0]
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._snapshot[1]
+
+    @property
+    def sources(self) -> np.ndarray:
+        return self._snapshot[2]
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.labels) == 0
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Consistent (unit embeddings, labels, sources) of one gallery state; don't modify.
+
+        Waits for a refresh in progress, so the snapshot is never older than it.
+        """
+        with self._lock:
+            return self._snapshot
+
+    def load(self) -> None:
+        """Load persisted embeddings and bring them up to date with the folder."""
+        self._load_cache()
+        self.refresh()
+
+    def refresh_if_changed(self) -> None:
+        """Refresh the gallery when a person folder changed, checked at most every `refresh_interval`."""
+        now = time.monotonic()
+        if now - self._last_check < self.refresh_interval:
+            return
+        self._last_check = now
+
+        if self._folder_signature() != self._signature:
+            self.refresh()
+
+    def get_metadata(self, name: str) -> Optional[Dict]:
+        """Cached `<faces_dir>/<name>/metadata.json`, or None if the person has none."""
+        return self.metadata.get(name)
+
+    def refresh(self) -> None:
+        """Embed new or modified images, drop removed ones and reload changed metadata."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        self._last_check = time.monotonic()
+        self._signature = self._folder_signature()
+        self._refresh_metadata(self._signature)
+
+        current = self._scan_images()
+        old_embeddings, old_labels, old_sources = self._snapshot
+        keep = np.array([
+            current.get(source) == self.source_mtimes.get(source)
+            for source in old_sources
+        ], dtype=bool)
+        stale = [path for path, mtime in current.items()
+                 if self.source_mtimes.get(path) != mtime]
+
+        if keep.all() and not stale:
+            return
+
+        embeddings: List[np.ndarray] = [old_embeddings[keep]] if keep.any() else []
+        labels: List[str] = list(old_labels[keep])
+        sources: List[str] = list(old_sources[keep])
+        source_mtimes = {path: mtime for path, mtime in self.source_mtimes.items()
+                         if path in current and path not in stale}
+
+        for path in stale:
+            vectors = self._embed_image(path)
+            source_mtimes[path] = current[path]
+            if not vectors:
+                continue
+            embeddings.append(np.stack(vectors))
+            labels.extend([Path(path).parent.name] * len(vectors))
+            sources.extend([path] * len(vectors))
+
+        self._snapshot = (
+            np.concatenate(embeddings).astype(np.float32)
+            if embeddings else np.empty((0, 0), dtype=np.float32),
+            np.array(labels, dtype=str),
+            np.array(sources, dtype=str),
+        )
+        self.source_mtimes = source_mtimes
+
+        logger.info(
+            f"Known face gallery updated: {len(self.labels)} faces, "
+            f"{len(set(labels))} people ({len(stale)} images embedded)")
+        self._save_cache()
+
+    def match(self, embedding: np.ndarray, tolerance: float) -> Optional[Tuple[str, float]]:
+        """Return (label, cosine distance) of the closest known face within tolerance."""
+        known_embeddings, known_labels, _ = self._snapshot
+        if len(known_labels) == 0:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+
+        distances = 1.0 - known_embeddings @ (query / norm)
+        best = int(np.argmin(distances))
+        best_distance = float(distances[best])
+
+        if best_distance > tolerance:
+            return None
+        return str(known_labels[best]), best_distance
+
+    def _embed_image(self, path: str) -> List[np.ndarray]:
+        """Embed every face found in a gallery image, normalised to unit length."""
+        try:
+            embedding_objs = DeepFace.represent(
+                img_path=path,
+                model_name=self.model,
+                enforce_detection=False,
+                detector_backend=self.detector_backend,
+                align=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to embed known face image {path}: {e}")
+            return []
+
+        vectors = []
+        for obj in embedding_objs:
+            vector = np.asarray(obj["embedding"], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vectors.append(vector / norm)
+        return vectors
+
+    def _scan_images(self) -> Dict[str, float]:
+        """Map every gallery image path to its modification time."""
+        images: Dict[str, float] = {}
+        if not os.path.isdir(self.faces_dir):
+            return images
+
+        for person in os.scandir(self.faces_dir):
+            if not person.is_dir() or person.name.startswith('.'):
+                continue
+            for entry in os.scandir(person.path):
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    images[entry.path] = entry.stat().st_mtime
+        return images
+
+    def _folder_signature(self) -> Tuple:
+        """Cheap change marker: person folders with their and their metadata's modification times."""
+        if not os.path.isdir(self.faces_dir):
+            return ()
+
+        signature = []
+        for entry in os.scandir(self.faces_dir):
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            try:
+                metadata_mtime = os.stat(
+                    os.path.join(entry.path, METADATA_FILE)).st_mtime_ns
+            except OSError:
+                metadata_mtime = 0
+            signature.append((entry.name, entry.stat().st_mtime_ns, metadata_mtime))
+        return tuple(sorted(signature))
+
+    def _refresh_metadata(self, signature: Tuple) -> None:
+        """Reload metadata.json of people whose file changed, forget removed ones."""
+        current = {name: metadata_mtime for name, _, metadata_mtime in signature}
+
+        for name in list(self.metadata):
+            if current.get(name, 0) == 0:
+                self.metadata.pop(name, None)
+                self._metadata_mtimes.pop(name, None)
+
+        for name, metadata_mtime in current.items():
+            if metadata_mtime == 0 or self._metadata_mtimes.get(name) == metadata_mtime:
+                continue
+
+            metadata_file = Path(self.faces_dir) / name / METADATA_FILE
+            self._metadata_mtimes[name] = metadata_mtime
+            try:
+                self.metadata[name] = json.loads(
+                    metadata_file.read_text(encoding="utf-8"))
+                logger.debug(f"Loaded custom metadata for '{name}' from {metadata_file}")
+            except Exception as e:
+                logger.warning(f"Failed to load metadata.json for '{name}': {e}")
+                self.metadata.pop(name, None)
+
+    def _load_cache(self) -> None:
+        if not self.cache_path.exists():
+            return
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                self._snapshot = (
+                    data["embeddings"].astype(np.float32),
+                    data["labels"],
+                    data["sources"],
+                )
+                self.source_mtimes = dict(zip(
+                    data["image_paths"].tolist(), data["image_mtimes"].tolist()))
+            logger.info(
+                f"Loaded {len(self.labels)} known face embeddings from {self.cache_path}")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable face gallery cache {self.cache_path}: {e}")
+
+    def _save_cache(self) -> None:
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.stem}.tmp.npz")
+        embeddings, labels, sources = self._snapshot
+        try:
+            np.savez(
+                tmp_path,
+                embeddings=embeddings,
+                labels=labels,
+                sources=sources,
+                image_paths=np.array(list(self.source_mtimes.keys()), dtype=str),
+                image_mtimes=np.array(list(self.source_mtimes.values()), dtype=np.float64),
+            )
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to persist face gallery cache: {e}")
@@ -1,17 +1,25 @@
 """Face recognition service with clustering for unknown faces."""
 from services.logger import get_logger
 from deepface import DeepFace
+from deepface.modules import preprocessing
 import numpy as np
 from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
-import cv2
 import os
-from scipy.spatial.distance import cosine
-from pathlib import Path
+from services.analysis.face_gallery import KnownFaceGallery
+from utils.frame_views import get_view
+from services.analysis.unknown_faces import (
+    UnknownFaceRegistry, PersistentUnknownFaceStore, UnknownFaceEmbeddingIndex
+)
 
 load_dotenv()
 logger = get_logger(__name__)
 
+# Output order of DeepFace's facial expression model
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+# Size DeepFace.analyze pads and resizes faces to before facial attribute models
+EMOTION_INPUT_SIZE = (224, 224)
+
 
 class FaceRecognizer:
     """    
@@ -73,13 +81,33 @@ class FaceRecognizer:
             - 'centerface': Lightweight, good for embedded systems
             - 'skip': Skip detection (use when face is already cropped)
             Default: 'retinaface'
+
+        analyze_emotion (bool, optional): Run emotion classification on detected faces.
+            Emotion runs as a separate step over all faces of a frame (or, with
+            `defer_emotion`, of a whole frame batch) in one batched forward pass of
+            DeepFace's emotion model. Default: True
+
+        cascade_detector_backend (str, optional): Fast detector backend (e.g. 'opencv',
+            'yunet', 'ssd') run before `detector_backend`. Frames where it finds no face
+            above `cascade_min_confidence` skip the accurate detector entirely.
+            Default: None (cascade off)
+
+        cascade_min_confidence (float, optional): Confidence a face from the cascade
+            detector needs for the frame to go through the accurate detector.
+            DeepFace reports a whole-frame "face" with confidence 0 when nothing is
+            found, so the default only requires a real detection. Default: 0.0
     
     Attributes:
         unknown_face_counter (int): Counter for generating unique Unknown_XXX IDs
-        unknown_faces_registry (Dict[str, Dict]): Registry of unknown face embeddings
-            and their appearance counts for clustering
+        unknown_faces_registry (UnknownFaceRegistry): Matrix of unknown face centroids
+            and their appearance counts, searched in one matrix-vector product
+        unknown_store (PersistentUnknownFaceStore): Library-wide unknown face clusters,
+            used instead of the per-video registry once `load_unknown_store` is called,
+            so the same unknown person keeps one ID across videos
         known_faces_folder (str): Path to directory containing known face images
             organized in subfolders by person name
+        gallery (KnownFaceGallery): In-memory embeddings of the known faces folder,
+            built by `load_gallery` and matched with one vectorized cosine computation
     
     """
     
@@ -89,31 +117,118 @@ class FaceRecognizer:
         model: str = 'VGG-Face',
         min_face_confidence: float = 0.70,
         unknown_clustering_threshold: float = 0.45,
-        detector_backend: str = "retinaface"
+        detector_backend: str = "retinaface",
+        analyze_emotion: bool = True,
+        cascade_detector_backend: Optional[str] = None,
+        cascade_min_confidence: float = 0.0
     ):
         self.tolerance = tolerance
+        self.analyze_emotion = analyze_emotion
+        self.cascade_detector_backend = cascade_detector_backend
+        self.cascade_min_confidence = cascade_min_confidence
         self.model = model
         self.detector_backend = detector_backend
         self.min_face_confidence = min_face_confidence
         self.unknown_clustering_threshold = unknown_clustering_threshold
         self.unknown_face_counter = 0
-        self.unknown_faces_registry: Dict[str, Dict] = {}
+        self.unknown_faces_registry = UnknownFaceRegistry()
+        self.unknown_store: Optional[PersistentUnknownFaceStore] = None
+        self._emotion_model = None
         self.known_faces_folder = os.getenv("FACES_DIR", '.faces')
+        self.gallery = KnownFaceGallery(
+            self.known_faces_folder, model, detector_backend)
 
         logger.info(
             f"FaceRecognizer initialized: model={model}, tolerance={tolerance}, "
             f"clustering_threshold={unknown_clustering_threshold}, "
             f"detector_backend={detector_backend}, "
+            f"cascade_detector_backend={cascade_detector_backend}, "
             f"min_face_confidence={min_face_confidence}"
         )
 
+    def load_gallery(self) -> None:
+        """Build the known face gallery (called once at model load time)."""
+        try:
+            self.gallery.load()
+        except Exception as e:
+            logger.error(f"Failed to load known face gallery: {e}")
+
+    def load_unknown_store(self, store_dir: str) -> None:
+        """Open the library-wide unknown face store (called once at model load time)."""
+        try:
+            store = PersistentUnknownFaceStore(store_dir)
+            store.load()
+            self.unknown_store = store
+        except Exception as e:
+            logger.error(
+                f"Failed to open unknown face store, falling back to per-video clustering: {e}")
+            self.unknown_store = None
+
+    def flush_unknown_store(self) -> None:
+        if self.unknown_store is None:
+            return
+        try:
+            self.unknown_store.flush()
+        except Exception as e:
+            logger.error(f"Failed to persist unknown face store: {e}")
+
+    def unknown_face_embedding(self, face_id: str) -> Optional[np.ndarray]:
+        """Current cluster centroid of an Unknown_XXX face, if it is registered."""
+        registry = self.unknown_store if self.unknown_store is not None else self.unknown_faces_registry
+        try:
+            return registry.centroid(registry.ids.index(face_id))
+        except ValueError:
+            return None
+
+    def rematch_unknown_faces(
+        self,
+        embedding_index: UnknownFaceEmbeddingIndex,
+        names: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """Match stored unknown face embeddings against the (refreshed) known face gallery."""
+        self.gallery.refresh()
+        known_embeddings, known_labels, _ = self.gallery.snapshot()
+        return embedding_index.match(
+            known_embeddings, known_labels, self.tolerance, names)
+
     def reset_unknown_registry(self) -> None:
-        self.unknown_faces_registry.clear()
+        self.unknown_faces_registry.reset()
         self.unknown_face_counter = 0
 
     def recognize_faces(self, frame: np.ndarray) -> List[Dict]:
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        recognized_faces = []
+        return self.identify_faces(self.detect_faces(frame))
+
+    def has_face_candidates(self, frame: np.ndarray) -> bool:
+        """Run the cascade detector; False means the frame can skip accurate detection."""
+        if not self.cascade_detector_backend or self.cascade_detector_backend == self.detector_backend:
+            return True
+
+        try:
+            face_objs = DeepFace.extract_faces(
+                img_path=get_view(frame, "rgb"),
+                detector_backend=self.cascade_detector_backend,
+                enforce_detection=False,
+                align=False,
+            )
+        except Exception as e:
+            # A failing gate must not hide faces
+            logger.warning(f"Cascade face detection error, running full detection: {e}")
+            return True
+
+        return any(
+            face_obj.get("confidence", 0.0) > self.cascade_min_confidence
+            for face_obj in face_objs
+        )
+
+    def detect_faces(self, frame: np.ndarray) -> List[Dict]:
+        """Detect faces above `min_face_confidence`, adding their (top, right, bottom, left) location."""
+        frame_rgb = get_view(frame, "rgb")
+        detected_faces = []
+
+        try:
+            self.gallery.refresh_if_changed()
+        except Exception as e:
+            logger.error(f"Known face gallery refresh error: {e}")
 
         try:
             face_objs = DeepFace.extract_faces(
@@ -123,121 +238,122 @@ class FaceRecognizer:
                 align=True,
             )
             logger.info(f"We detected {len(face_objs)} faces")
+
             for face_obj in face_objs:
-                try:
-                    face_data = self._process_face(face_obj)
-                    if face_data:
-                        recognized_faces.append(face_data)
-                except Exception as e:
-                    logger.error(f"Face processing error: {e}")
+                if face_obj.get("confidence", 1.0) < self.min_face_confidence:
+                    logger.warning(f"Skip a face detected because it's lower than minimum confidence: {self.min_face_confidence}, confidence: {face_obj.get('confidence', 1.0)}")
+                    continue
+
+                facial_area = face_obj['facial_area']
+                top = facial_area['y']
+                left = facial_area['x']
+                bottom = facial_area['y'] + facial_area['h']
+                right = facial_area['x'] + facial_area['w']
+                face_obj["location"] = (top, right, bottom, left)
+                detected_faces.append(face_obj)
 
         except Exception as e:
             logger.error(f"Face detection error: {e}")
 
+        return detected_faces
+
+    def identify_faces(self, face_objs: List[Dict], defer_emotion: bool = False) -> List[Dict]:
+        """Identify detected faces, then run the emotion step over all of them.
+
+        With `defer_emotion` the crops are left on the faces under `face_crop`
+        so the caller can classify several frames at once with `classify_emotions`.
+        """
+        recognized_faces = []
+        face_crops = []
+
+        for face_obj in face_objs:
+            try:
+                face_data = self._process_face(face_obj)
+                if face_data:
+                    recognized_faces.append(face_data)
+                    if not defer_emotion:
+                        face_crops.append(face_data.pop("face_crop"))
+            except Exception as e:
+                logger.error(f"Face processing error: {e}")
+
+        if self.analyze_emotion and face_crops:
+            emotions = self.classify_emotions(face_crops)
+            for face_data, emotion_data in zip(recognized_faces, emotions):
+                if emotion_data:
+                    face_data["emotion_label"] = emotion_data.get('emotion')
+                    face_data["emotion_confidence"] = emotion_data.get('confidence')
+
         return recognized_faces
 
     def _process_face(self, face_obj: Dict) -> Optional[Dict]:
-        facial_area = face_obj['facial_area']
-        if face_obj.get("confidence", 1.0) < self.min_face_confidence:
-            logger.warning(f"Skip a face detected because it's lower than minimum confidence: {self.min_face_confidence}, confidence: {face_obj.get('confidence', 1.0)}")
-            return None
-        
-        logger.info(f"Face passed the confidence check with confidence: {face_obj.get('confidence', 1.0)}")
+        """Identify one detected face from a single embedding of its crop.
 
-        face_img = face_obj["face"]
+        The crop is converted to uint8 once and embedded once; that vector is
+        used for known face matching and unknown clustering, and returned with
+        the face for persistence. The crop itself is returned under
+        `face_crop` for the emotion step.
+        """
+        logger.info(f"Face passed the confidence check with confidence: {face_obj.get('confidence', 1.0)}")
 
-        top = facial_area['y']
-        left = facial_area['x']
-        bottom = facial_area['y'] + facial_area['h']
-        right = facial_area['x'] + facial_area['w']
+        face_img = self._to_uint8(face_obj["face"])
 
-        name, confidence, is_clustered = self._recognize_or_cluster(face_img)
+        embedding = self._generate_embedding(face_img)
+        name, confidence, is_clustered = self._recognize_or_cluster(embedding)
         logger.info(f"name: {name}, confidence: {confidence}")
-        emotion_data = self._analyze_emotion(face_img)
         return {
             "name": name,
             "confidence": confidence,
-            "location": (top, right, bottom, left),
-            "emotion_label": emotion_data.get('emotion') if emotion_data else None,
-            "emotion_confidence": emotion_data.get('confidence') if emotion_data else None,
+            "location": face_obj["location"],
+            "emotion_label": None,
+            "emotion_confidence": None,
             "is_clustered": is_clustered,
-            "detection_confidence": face_obj.get("confidence", 1.0) * 100
+            "detection_confidence": face_obj.get("confidence", 1.0) * 100,
+            "embedding": embedding,
+            "face_crop": face_img
         }
 
-    def _recognize_or_cluster(self, face_img: np.ndarray) -> Tuple[str, float, bool]:
-        best_match_name = None
-        best_distance = float('inf')
+    @staticmethod
+    def _to_uint8(face_img: np.ndarray) -> np.ndarray:
+        """DeepFace returns crops as floats in [0, 1]; models expect uint8 pixels."""
+        return (
+            (face_img * 255).astype(np.uint8)
+            if face_img.max() <= 1.0
+            else face_img.astype(np.uint8)
+        )
 
-       # If we have a face recognized, we can just the person name from the faces folder for that person using identity from DeepFace
-       # If the face is unknown, we need to check if that face has appeared before in this video (by get the current unknown face embedding and check it back with
+    def _recognize_or_cluster(self, embedding: Optional[np.ndarray]) -> Tuple[str, float, bool]:
+       # If we have a face recognized, we can just the person name from the faces folder for that person using the known face gallery
+       # If the face is unknown, we need to check if that face has appeared before in this video (by checking the same face embedding against
        # our unknown_faces_registry for similarity).
        # if similar and meet the unknown_clustering_threshold , we can keep the same unknown id and pass data back to FaceRecognitionPlugin
        # to save their appearances
 
-        if self._validate_faces_folder():
+        if embedding is None:
+            return self._create_new_unknown(), 0.0, False
+
+        if not self.gallery.is_empty:
             try:
-                logger.info(f"Finding the face name across the faces folder...")
-                dfs = DeepFace.find(
-                    img_path=face_img,
-                    db_path=self.known_faces_folder,
-                    model_name=self.model,
-                    enforce_detection=False,
-                    detector_backend=self.detector_backend,
-                    distance_metric="cosine",
-                    silent=True
-                )
-
-                for df in dfs:
-                    if df.empty:
-                        continue
-
-                    for _, instance in df.iterrows():
-                        distance = instance["distance"]
-                        if distance <= self.tolerance and distance < best_distance:
-                            best_distance = distance
-                            best_match_name = Path(
-                                instance["identity"]).parent.name
-
-                if best_match_name:
+                match = self.gallery.match(embedding, self.tolerance)
+
+                if match:
+                    best_match_name, best_distance = match
                     confidence = max(0, 1 - best_distance) * 100
                     return best_match_name, confidence, False
 
             except Exception as e:
                 logger.error(f"Known face recognition error: {e}")
 
-        return self._cluster_unknown_face(face_img)
+        return self._cluster_unknown_face(embedding)
 
-    def _cluster_unknown_face(self, face_img: np.ndarray) -> Tuple[str, float, bool]:
+    def _cluster_unknown_face(self, embedding: np.ndarray) -> Tuple[str, float, bool]:
         try:
-            embedding = self._generate_embedding(face_img)
-            if embedding is None:
-                return self._create_new_unknown(), 0.0, False
-
-            best_match_id = None
-            best_similarity = 0.0
-
-            for unknown_id, unknown_data in self.unknown_faces_registry.items():
-                try:
-                    distance = cosine(embedding, unknown_data['embedding'])
-                    similarity = 1 - distance
-
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_match_id = unknown_id
-                except Exception as e:
-                    logger.error(
-                        f"Similarity calculation error for {unknown_id}: {e}")
-
-            if best_match_id and (1 - best_similarity) <= self.unknown_clustering_threshold:
-                registry = self.unknown_faces_registry[best_match_id]
-                registry['appearances'] += 1
-
-                alpha = 1.0 / registry['appearances']
-                registry['embedding'] = (
-                    (1 - alpha) * registry['embedding'] + alpha * embedding
-                )
-
-                return best_match_id, best_similarity * 100, True
+            registry = self.unknown_store if self.unknown_store is not None else self.unknown_faces_registry
+            match = registry.search(embedding)
+
+            if match and (1 - match[1]) <= self.unknown_clustering_threshold:
+                row, best_similarity = match
+                registry.update(row, embedding)
+                return registry.ids[row], best_similarity * 100, True
             else:
                 unknown_id = self._create_new_unknown()
                 self._register_unknown_face(unknown_id, embedding)
@@ -249,14 +365,8 @@ class FaceRecognizer:
 
     def _generate_embedding(self, face_img: np.ndarray) -> Optional[np.ndarray]:
         try:
-            face_img_uint8 = (
-                (face_img * 255).astype(np.uint8)
-                if face_img.max() <= 1.0
-                else face_img.astype(np.uint8)
-            )
-
             embedding_objs = DeepFace.represent(
-                img_path=face_img_uint8,
+                img_path=face_img,
                 model_name=self.model,
                 enforce_detection=False,
                 detector_backend="skip",
@@ -264,7 +374,9 @@ class FaceRecognizer:
             )
 
             if embedding_objs:
-                return np.array(embedding_objs[0]["embedding"])
+                embedding = np.asarray(embedding_objs[0]["embedding"], dtype=np.float32)
+                norm = np.linalg.norm(embedding)
+                return embedding / norm if norm > 0 else embedding
 
         except Exception as e:
             logger.error(f"Embedding generation error: {e}")
@@ -272,28 +384,65 @@ class FaceRecognizer:
         return None
 
     def _create_new_unknown(self) -> str:
+        if self.unknown_store is not None:
+            return self.unknown_store.next_face_id()
         unknown_id = f"Unknown_{self.unknown_face_counter:03d}"
         self.unknown_face_counter += 1
         return unknown_id
 
     def _register_unknown_face(self, unknown_id: str, embedding: np.ndarray) -> None:
-        self.unknown_faces_registry[unknown_id] = {
-            'embedding': embedding,
-            'appearances': 1,
-        }
-        logger.info(
-            f"Registered {unknown_id} (total: {len(self.unknown_faces_registry)})")
+        registry = self.unknown_store if self.unknown_store is not None else self.unknown_faces_registry
+        registry.add(unknown_id, embedding)
+        logger.info(f"Registered {unknown_id} (total: {len(registry)})")
+
+    def classify_emotions(self, face_imgs: List[np.ndarray]) -> List[Optional[Dict]]:
+        """Classify emotion for a list of face crops in one batched model call.
+
+        Falls back to one `DeepFace.analyze` call per crop if the emotion model
+        can't be built or the batched prediction fails.
+        """
+        if not face_imgs:
+            return []
+
+        model = self._get_emotion_model()
+        if model is not None:
+            try:
+                # Same input DeepFace.analyze hands the model: channel order kept, pixels
+                # in [0, 1], padded and resized to one size so the crops stack into a batch
+                batch = np.concatenate([
+                    preprocessing.resize_image(
+                        img=face_img.astype(np.float32) / 255.0, target_size=EMOTION_INPUT_SIZE)
+                    for face_img in face_imgs
+                ])
+                predictions = np.asarray(model.predict(batch), dtype=np.float32)
+                predictions = predictions.reshape(len(face_imgs), -1)
+
+                totals = predictions.sum(axis=1, keepdims=True)
+                percentages = 100 * predictions / np.maximum(totals, 1e-12)
+                best = percentages.argmax(axis=1)
+                return [
+                    {'emotion': EMOTION_LABELS[idx], 'confidence': float(percentages[row, idx])}
+                    for row, idx in enumerate(best)
+                ]
+            except Exception as e:
+                logger.warning(f"Batched emotion analysis failed, analysing faces one by one: {e}")
+
+        return [self._analyze_emotion(face_img) for face_img in face_imgs]
+
+    def _get_emotion_model(self):
+        if self._emotion_model is None:
+            try:
+                self._emotion_model = DeepFace.build_model(
+                    model_name="Emotion", task="facial_attribute")
+            except Exception as e:
+                logger.warning(f"Failed to build emotion model: {e}")
+                return None
+        return self._emotion_model
 
     def _analyze_emotion(self, face_img: np.ndarray) -> Optional[Dict]:
         try:
-            face_img_uint8 = (
-                (face_img * 255).astype(np.uint8)
-                if face_img.max() <= 1.0
-                else face_img.astype(np.uint8)
-            )
-
             emotion = DeepFace.analyze(
-                img_path=face_img_uint8,
+                img_path=face_img,
                 actions=['emotion'],
                 detector_backend="skip",
                 enforce_detection=False,
@@ -312,22 +461,3 @@ class FaceRecognizer:
             logger.warning(f"Emotion analysis error: {e}")
 
         return None
-
-    def _validate_faces_folder(self) -> bool:
-        if not os.path.exists(self.known_faces_folder):
-            return False
-
-        if not os.path.isdir(self.known_faces_folder):
-            return False
-
-        for item in os.listdir(self.known_faces_folder):
-            item_path = os.path.join(self.known_faces_folder, item)
-            if os.path.isdir(item_path):
-                files = [
-                    f for f in os.listdir(item_path)
-                    if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-                ]
-                if files:
-                    return True
-
-        return False
@@ -0,0 +1,141 @@
+"""Face track propagation across consecutive sampled frames."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+Location = Tuple[int, int, int, int]
+
+
+@dataclass
+class FaceTrack:
+    """A face followed across sampled frames, carrying its last identity."""
+    track_id: int
+    location: Location
+    identity: Dict = field(default_factory=dict)
+    frames_since_refresh: int = 0
+    missed: int = 0
+
+
+class FaceTracker:
+    """
+    IoU/centroid tracker that lets identities flow along face tracks.
+
+    Detections of a frame are greedily matched to the live tracks by IoU, with
+    a centroid-distance fallback for faces that moved more than their boxes
+    overlap. A matched detection reuses the track identity until the track
+    reaches `refresh_interval` frames, after which it is identified again;
+    new detections start a track and tracks unmatched for more than
+    `max_missed` frames are dropped.
+
+    Args:
+        iou_threshold (float): Minimum IoU to continue a track
+        max_centroid_shift (float): Maximum centroid shift, relative to the
+            track's box diagonal, accepted when IoU alone doesn't match
+        refresh_interval (int): Frames after which a tracked face is re-identified
+        max_missed (int): Frames a track may go unmatched before it is lost
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_centroid_shift: float = 0.5,
+        refresh_interval: int = 10,
+        max_missed: int = 1
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_shift = max_centroid_shift
+        self.refresh_interval = refresh_interval
+        self.max_missed = max_missed
+        self.tracks: List[FaceTrack] = []
+        self._next_track_id = 0
+
+    def reset(self) -> None:
+        self.tracks = []
+        self._next_track_id = 0
+
+    def assign(self, locations: List[Location]) -> List[Optional[FaceTrack]]:
+        """Match detections to live tracks; unmatched detections get None."""
+        candidates = []
+        for det_idx, location in enumerate(locations):
+            for track_idx, track in enumerate(self.tracks):
+                score = self._match_score(track.location, location)
+                if score is not None:
+                    candidates.append((score, det_idx, track_idx))
+
+        assigned: List[Optional[FaceTrack]] = [None] * len(locations)
+        used_tracks = set()
+        for score, det_idx, track_idx in sorted(candidates, reverse=True):
+            if assigned[det_idx] is not None or track_idx in used_tracks:
+                continue
+            assigned[det_idx] = self.tracks[track_idx]
+            used_tracks.add(track_idx)
+
+        for track_idx, track in enumerate(self.tracks):
+            if track_idx not in used_tracks:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        return assigned
+
+    def needs_identification(self, track: Optional[FaceTrack]) -> bool:
+        return (
+            track is None
+            or not track.identity
+            or track.frames_since_refresh >= self.refresh_interval
+        )
+
+    def propagate(self, track: FaceTrack, location: Location) -> Dict:
+        """Continue a track on this frame, returning its carried identity."""
+        track.location = location
+        track.missed = 0
+        track.frames_since_refresh += 1
+        return dict(track.identity)
+
+    def refresh(self, track: Optional[FaceTrack], location: Location, identity: Dict) -> FaceTrack:
+        """Store a fresh identity on a track, starting a new track if needed."""
+        if track is None:
+            track = FaceTrack(track_id=self._next_track_id, location=location)
+            self._next_track_id += 1
+            self.tracks.append(track)
+
+        track.location = location
+        track.identity = identity
+        track.frames_since_refresh = 0
+        track.missed = 0
+        return track
+
+    def _match_score(self, previous: Location, current: Location) -> Optional[float]:
+        """IoU in [0, 1] when boxes overlap enough, a lower centroid score otherwise."""
+        iou = self._iou(previous, current)
+        if iou >= self.iou_threshold:
+            return 1.0 + iou
+
+        p_top, p_right, p_bottom, p_left = previous
+        c_top, c_right, c_bottom, c_left = current
+        diagonal = ((p_right - p_left) ** 2 + (p_bottom - p_top) ** 2) ** 0.5
+        if diagonal <= 0:
+            return None
+
+        shift = (
+            ((c_left + c_right) - (p_left + p_right)) ** 2
+            + ((c_top + c_bottom) - (p_top + p_bottom)) ** 2
+        ) ** 0.5 / 2
+        relative_shift = shift / diagonal
+        if relative_shift > self.max_centroid_shift:
+            return None
+        return 1.0 - relative_shift
+
+    @staticmethod
+    def _iou(a: Location, b: Location) -> float:
+        a_top, a_right, a_bottom, a_left = a
+        b_top, b_right, b_bottom, b_left = b
+
+        inter_w = min(a_right, b_right) - max(a_left, b_left)
+        inter_h = min(a_bottom, b_bottom) - max(a_top, b_top)
+        if inter_w <= 0 or inter_h <= 0:
+            return 0.0
+
+        intersection = inter_w * inter_h
+        area_a = (a_right - a_left) * (a_bottom - a_top)
+        area_b = (b_right - b_left) * (b_bottom - b_top)
+        union = area_a + area_b - intersection
+        return intersection / union if union > 0 else 0.0
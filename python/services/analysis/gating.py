@@ -0,0 +1,74 @@
+"""Per-frame gating rules between plugins."""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.types import FrameAnalysis
+
+# Condition on (current frame, previous frame) deciding whether a plugin runs
+GateCondition = Callable[[FrameAnalysis, Optional[FrameAnalysis]], bool]
+
+
+@dataclass(frozen=True)
+class GatingRule:
+    """
+    Runs `plugin` on a frame only when `condition` holds.
+
+    `reads` lists the FrameAnalysis keys the condition looks at; plugins
+    providing them are scheduled before `plugin`, and the rule is ignored
+    on frames where those keys are missing (e.g. their plugin is disabled).
+    A gated frame gets `skip_output`, or the previous frame's output of the
+    plugin when it is None.
+    """
+    plugin: str
+    reads: Tuple[str, ...]
+    condition: GateCondition
+    skip_output: Optional[Dict[str, Any]] = None
+    description: str = ""
+
+
+def contains_label(key: str, label: str) -> GateCondition:
+    """Condition: the list under `key` has an entry with this `label`."""
+    def condition(current: FrameAnalysis, previous: Optional[FrameAnalysis]) -> bool:
+        return any(item.get("label") == label for item in current.get(key) or [])
+    return condition
+
+
+def faces_changed(grid: int = 8) -> GateCondition:
+    """Condition: the faces differ from the previous frame in names, count or coarse position."""
+    def signature(frame_analysis: FrameAnalysis) -> Tuple:
+        faces = []
+        for face in frame_analysis.get("faces") or []:
+            bbox = face.get("bbox") or {}
+            dims = face.get("frame_dimensions") or {}
+            width = dims.get("width") or 1
+            height = dims.get("height") or 1
+            faces.append((
+                str(face.get("name")),
+                int(bbox.get("x", 0) * grid / width),
+                int(bbox.get("y", 0) * grid / height),
+                int(bbox.get("width", 0) * grid / width),
+            ))
+        return tuple(sorted(faces))
+
+    def condition(current: FrameAnalysis, previous: Optional[FrameAnalysis]) -> bool:
+        if previous is None or "faces" not in previous:
+            return True
+        return signature(current) != signature(previous)
+    return condition
+
+
+DEFAULT_GATING_RULES: List[GatingRule] = [
+    GatingRule(
+        plugin="FaceRecognitionPlugin",
+        reads=("objects",),
+        condition=contains_label("objects", "person"),
+        skip_output={"faces": []},
+        description="faces only on frames where object detection found a person",
+    ),
+    GatingRule(
+        plugin="ShotTypePlugin",
+        reads=("faces",),
+        condition=faces_changed(),
+        description="shot type only when the faces changed since the previous frame",
+    ),
+]
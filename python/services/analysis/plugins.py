@@ -1,18 +1,21 @@
 """Plugin management for video analysis."""
+import copy
 import importlib
 import inspect
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from dataclasses import asdict
 
-from core.config import AnalysisConfig
+from core.config import AnalysisConfig, AnalysisPlan
 from core.types import FrameAnalysis, AnalysisCancelledError
 from monitoring.metrics import PluginMetricsCollector
+from services.analysis.gating import DEFAULT_GATING_RULES, GatingRule
 from services.logger import get_logger
 import numpy as np
 from plugins.base import AnalyzerPlugin, FrameAnalysis
 import traceback
 from threading import Event
+from concurrent.futures import ThreadPoolExecutor
 
 logger = get_logger(__name__)
 
@@ -24,6 +27,16 @@ except ImportError:
     AnalyzerPlugin = None
 
 
+PLUGIN_DEFINITIONS = [
+    ("ObjectDetectionPlugin", "object_detection"),
+    ("FaceRecognitionPlugin", "face_recognition"),
+    ("ShotTypePlugin", "shot_type"),
+    ("DominantColorPlugin", "dominant_color"),
+    ("DescriptorPlugin", "descriptor"),
+    ("TextDetectionPlugin", "text_detection"),
+]
+
+
 class PluginManager:
     """Manages video analysis plugins."""
 
@@ -32,9 +45,26 @@ class PluginManager:
         self.plugins:  List[AnalyzerPlugin] = []
         self.metrics_collector = PluginMetricsCollector()
         self.frame_counters: Dict[str, int] = {}
+        self.enabled_plugins: Set[str] = set()
+        self.gating_rules: Dict[str, List[GatingRule]] = {}
+        if self.config.plugin_gating:
+            for rule in DEFAULT_GATING_RULES:
+                self.gating_rules.setdefault(rule.plugin, []).append(rule)
+        # Last frame of the previous batch, so gating sees across batch boundaries
+        self._previous_analysis: Optional[FrameAnalysis] = None
 
         self._load_plugins()
         self._load_plugins_models()
+        self.enabled_plugins = {plugin.__class__.__name__ for plugin in self.plugins}
+
+        self.stages = self._build_stages()
+        # torch, OpenCV and ONNX kernels release the GIL, so independent plugins overlap
+        self.executor: Optional[ThreadPoolExecutor] = None
+        if self.config.plugin_workers > 1:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config.plugin_workers,
+                thread_name_prefix="plugin"
+            )
 
     def _load_plugins(self) -> None:
         """Load all available plugins."""
@@ -45,16 +75,7 @@ class PluginManager:
         config_dict = asdict(self.config)
         config_dict['device'] = self.config.device
 
-        plugin_definitions = [
-            ("ObjectDetectionPlugin", "object_detection"),
-            ("FaceRecognitionPlugin", "face_recognition"),
-            ("ShotTypePlugin", "shot_type"),
-            ("DominantColorPlugin", "dominant_color"),
-            ("DescriptorPlugin", "descriptor"),
-            ("TextDetectionPlugin", "text_detection"),
-        ]
-
-        for plugin_name, module_stem in plugin_definitions:
+        for plugin_name, module_stem in PLUGIN_DEFINITIONS:
             try:
                 module = importlib.import_module(f"plugins.{module_stem}")
 
@@ -73,15 +94,71 @@ class PluginManager:
 
         logger.info(f"Loaded {len(self.plugins)} plugins")
 
-    def setup_plugins(self, video_path: str, job_id: str) -> None:
-        """Initialize all plugins."""
+    def setup_plugins(
+        self,
+        video_path: str,
+        job_id: str,
+        plan: Optional[AnalysisPlan] = None
+    ) -> None:
+        """Initialize the plugins selected by the job's plan, raising ValueError on unknown plugins."""
+        plan = plan or AnalysisPlan()
+        self.enabled_plugins = self._resolve_enabled_plugins(plan)
+        self._previous_analysis = None
+        logger.info(
+            f"Enabled plugins for job {job_id}: {sorted(self.enabled_plugins)}")
+
         for plugin in self.plugins:
+            if plugin.__class__.__name__ not in self.enabled_plugins:
+                continue
             try:
+                plugin.configure_job(plan)
                 plugin.setup(video_path, job_id)
             except Exception as e:
                 logger.error(
                     f"Failed to setup {plugin.__class__.__name__}: {e}")
 
+    def _resolve_enabled_plugins(self, plan: AnalysisPlan) -> Set[str]:
+        """Resolve plan selection to plugin class names, dropping unmet dependencies.
+
+        Raises ValueError when the plan names a plugin that doesn't exist.
+        """
+        aliases = {}
+        for plugin_name, module_stem in PLUGIN_DEFINITIONS:
+            aliases[plugin_name.lower()] = plugin_name
+            aliases[module_stem] = plugin_name
+
+        loaded = [plugin.__class__.__name__ for plugin in self.plugins]
+
+        if plan.plugins is None:
+            enabled = set(loaded)
+        else:
+            enabled = set()
+            for name in plan.plugins:
+                resolved = aliases.get(name.lower())
+                if resolved is None:
+                    raise ValueError(f"settings.plugins has an unknown plugin: {name}")
+                enabled.add(resolved)
+
+        if not plan.enable_ocr:
+            enabled.discard("TextDetectionPlugin")
+        if not plan.enable_captions:
+            enabled.discard("DescriptorPlugin")
+
+        # A plugin whose inputs no enabled plugin produces would only emit defaults
+        provided = set()
+        for plugin in self.plugins:
+            if plugin.__class__.__name__ in enabled:
+                provided.update(plugin.provides)
+        for plugin in self.plugins:
+            plugin_name = plugin.__class__.__name__
+            missing = [key for key in plugin.requires if key not in provided]
+            if plugin_name in enabled and missing:
+                logger.info(
+                    f"Disabling {plugin_name}: requires {missing} from a disabled plugin")
+                enabled.discard(plugin_name)
+
+        return enabled & set(loaded)
+
     def _load_plugins_models(self) -> None:
         """Initialize all plugins models"""
         for plugin in self.plugins:
@@ -100,28 +177,242 @@ class PluginManager:
         cancel_flag: Optional[Event] = None 
     ) -> FrameAnalysis:
         """Process frame through all applicable plugins."""
-        for plugin in self.plugins:
-            
+        return self.process_batch(
+            [frame], [frame_analysis], video_path, cancel_flag)[0]
+
+    def process_batch(
+        self,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str,
+        cancel_flag: Optional[Event] = None
+    ) -> List[FrameAnalysis]:
+        """Process a batch of frames, one dependency stage at a time.
+
+        Plugins inside a stage don't depend on each other and run concurrently,
+        each on its own copy of the frame analyses; their output is merged
+        back before the next stage starts, so dependent plugins (e.g. shot
+        type on faces) always see what they require.
+        """
+        last_reader = self._last_source_frame_stage()
+        for index, stage in enumerate(self.stages):
+            if index > last_reader:
+                self._release_source_frames(frame_analyses)
+
             if cancel_flag and cancel_flag.is_set():
                 logger.info("Cancellation detected mid-batch, stopping")
                 raise AnalysisCancelledError()
-            
-            if not self._should_run_plugin(plugin, frame_idx):
+
+            # Skip intervals are counter based, so decide eligibility up front
+            scheduled = []
+            gated_by_plugin = []
+            for plugin in stage:
+                if plugin.__class__.__name__ not in self.enabled_plugins:
+                    continue
+                eligible = [
+                    i for i, frame_analysis in enumerate(frame_analyses)
+                    if self._should_run_plugin(plugin, frame_analysis.get('frame_idx', i))
+                ]
+                eligible, gated = self._apply_gating(plugin, eligible, frame_analyses)
+                if gated:
+                    gated_by_plugin.append((plugin, gated))
+                if eligible:
+                    scheduled.append((plugin, eligible))
+
+            if len(scheduled) <= 1 or self.executor is None:
+                for plugin, eligible in scheduled:
+                    self._run_plugin_on_batch(
+                        plugin, frames, frame_analyses, eligible, video_path)
+                self._fill_gated_frames(gated_by_plugin, frame_analyses)
                 continue
 
+            futures = []
+            for plugin, eligible in scheduled:
+                working_copies = [dict(frame_analysis) for frame_analysis in frame_analyses]
+                future = self.executor.submit(
+                    self._run_plugin_on_batch,
+                    plugin, frames, working_copies, eligible, video_path
+                )
+                futures.append((plugin, eligible, working_copies, future))
+
+            for plugin, eligible, working_copies, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(
+                        f"Plugin {plugin.__class__.__name__} failed on batch: {e}")
+                    self.metrics_collector.record_error(plugin.__class__.__name__)
+                    continue
+
+                # Only the plugin's own keys, so it can't clobber other plugins' output
+                for i in eligible:
+                    frame_analyses[i].update({
+                        key: working_copies[i][key]
+                        for key in plugin.provides if key in working_copies[i]
+                    })
+
+            self._fill_gated_frames(gated_by_plugin, frame_analyses)
+
+        self._release_source_frames(frame_analyses)
+        if frame_analyses:
+            self._previous_analysis = frame_analyses[-1]
+        return frame_analyses
+
+    def needs_source_frames(self) -> bool:
+        """Whether an enabled plugin reads the full-resolution `source_frame`."""
+        return any(
+            plugin.uses_source_frame and plugin.__class__.__name__ in self.enabled_plugins
+            for plugin in self.plugins
+        )
+
+    def _last_source_frame_stage(self) -> int:
+        """Index of the last stage with an enabled plugin reading `source_frame`, or -1."""
+        last = -1
+        for index, stage in enumerate(self.stages):
+            if any(plugin.uses_source_frame and plugin.__class__.__name__ in self.enabled_plugins
+                   for plugin in stage):
+                last = index
+        return last
+
+    @staticmethod
+    def _release_source_frames(frame_analyses: List[FrameAnalysis]) -> None:
+        """Drop the full-resolution frames once no remaining plugin reads them."""
+        for frame_analysis in frame_analyses:
+            frame_analysis.pop('source_frame', None)
+
+    def _apply_gating(
+        self,
+        plugin: AnalyzerPlugin,
+        eligible: List[int],
+        frame_analyses: List[FrameAnalysis]
+    ) -> Tuple[List[int], List[Tuple[int, GatingRule]]]:
+        """Split eligible frames into those to run and those a gating rule skips.
+
+        A rule only applies when every key it reads is present on the frame,
+        so disabling the plugin that provides them turns the rule off.
+        """
+        rules = self.gating_rules.get(plugin.__class__.__name__)
+        if not rules:
+            return eligible, []
+
+        run, gated = [], []
+        for i in eligible:
+            current = frame_analyses[i]
+            previous = frame_analyses[i - 1] if i > 0 else self._previous_analysis
+            failed = next((
+                rule for rule in rules
+                if all(key in current for key in rule.reads)
+                and not rule.condition(current, previous)
+            ), None)
+            if failed is None:
+                run.append(i)
+            else:
+                gated.append((i, failed))
+
+        if gated:
+            self.metrics_collector.record_gated(plugin.__class__.__name__, len(gated))
+        return run, gated
+
+    def _fill_gated_frames(
+        self,
+        gated_by_plugin: List[Tuple[AnalyzerPlugin, List[Tuple[int, GatingRule]]]],
+        frame_analyses: List[FrameAnalysis]
+    ) -> None:
+        """Write the output of gated frames once the stage ran, in frame order."""
+        for plugin, gated in gated_by_plugin:
+            for i, rule in gated:
+                if rule.skip_output is not None:
+                    frame_analyses[i].update(copy.deepcopy(rule.skip_output))
+                    continue
+                previous = frame_analyses[i - 1] if i > 0 else self._previous_analysis
+                for key in plugin.provides:
+                    if previous is not None and key in previous:
+                        frame_analyses[i][key] = previous[key]
+
+    def _run_plugin_on_batch(
+        self,
+        plugin: AnalyzerPlugin,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        eligible: List[int],
+        video_path: str
+    ) -> None:
+        """Run one plugin over the eligible frames, batched when supported."""
+        if plugin.supports_batching() and len(eligible) > 1:
+            try:
+                results = self._execute_plugin_batch(
+                    plugin,
+                    [frames[i] for i in eligible],
+                    [frame_analyses[i] for i in eligible],
+                    video_path
+                )
+                for i, result in zip(eligible, results):
+                    if result:
+                        frame_analyses[i].update(result)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Batched {plugin.__class__.__name__} failed, "
+                    f"falling back to per-frame processing: {e}"
+                )
+                logger.error(traceback.format_exc())
+
+        for i in eligible:
+            frame_idx = frame_analyses[i].get('frame_idx', i)
             try:
                 result = self._execute_plugin(
-                    plugin, frame, frame_analysis, video_path)
+                    plugin, frames[i], frame_analyses[i], video_path)
                 if result:
-                    frame_analysis.update(result)
+                    frame_analyses[i].update(result)
             except Exception as e:
                 logger.warning(
                     f"Plugin {plugin.__class__.__name__} failed on frame {frame_idx}: {e}"
                 )
                 logger.error(traceback.format_exc())
-                self.metrics_collector.record_error(plugin.__class__.__name__)
 
-        return frame_analysis
+    def _build_stages(self) -> List[List[AnalyzerPlugin]]:
+        """Group plugins into dependency stages.
+
+        A plugin lands one stage after the latest earlier plugin that provides
+        a key it requires or its gating rules read (or writes a key it also
+        writes). Plugins that share
+        a stage are independent and may run concurrently.
+        """
+        stages: List[List[AnalyzerPlugin]] = []
+        plugin_stage: Dict[str, int] = {}
+        key_stage: Dict[str, int] = {}
+
+        for plugin in self.plugins:
+            plugin_name = plugin.__class__.__name__
+            stage_idx = 0
+
+            for key in plugin.requires:
+                if key in key_stage:
+                    stage_idx = max(stage_idx, key_stage[key] + 1)
+                else:
+                    logger.warning(
+                        f"{plugin_name} requires '{key}' but no earlier plugin provides it")
+
+            # Gating rules read earlier output, but don't make it a requirement
+            for rule in self.gating_rules.get(plugin_name, []):
+                for key in rule.reads:
+                    if key in key_stage:
+                        stage_idx = max(stage_idx, key_stage[key] + 1)
+
+            for key in plugin.provides:
+                if key in key_stage:
+                    stage_idx = max(stage_idx, key_stage[key] + 1)
+
+            for key in plugin.provides:
+                key_stage[key] = stage_idx
+
+            while len(stages) <= stage_idx:
+                stages.append([])
+            stages[stage_idx].append(plugin)
+            plugin_stage[plugin_name] = stage_idx
+
+        logger.info(f"Plugin execution stages: {plugin_stage}")
+        return stages
 
     def _should_run_plugin(self, plugin: AnalyzerPlugin, video_path: int) -> bool:
         """Determine if plugin should run on this frame."""
@@ -151,18 +442,61 @@ class PluginManager:
     ) -> FrameAnalysis:
         """Execute plugin with timing."""
         plugin_name = plugin.__class__.__name__
+        counters_before = (plugin.gated_frames, plugin.reused_frames)
         start_time = time.time()
 
         try:
             result = plugin.analyze_frame(frame, frame_analysis, video_path)
             duration_ms = (time.time() - start_time) * 1000
             self.metrics_collector.record_execution(plugin_name, duration_ms)
+            self._record_frame_counters(plugin, counters_before)
             return result
         except Exception as e:
             duration_ms = (time.time() - start_time) * 1000
             self.metrics_collector.record_error(plugin_name)
             raise
 
+    def _execute_plugin_batch(
+        self,
+        plugin: AnalyzerPlugin,
+        frames: List[np.ndarray],
+        frame_analyses: List[FrameAnalysis],
+        video_path: str
+    ) -> List[FrameAnalysis]:
+        """Execute a batched plugin call, recording the amortized time per frame."""
+        plugin_name = plugin.__class__.__name__
+        counters_before = (plugin.gated_frames, plugin.reused_frames)
+        start_time = time.time()
+
+        try:
+            results = plugin.analyze_batch(frames, frame_analyses, video_path)
+            duration_ms = (time.time() - start_time) * 1000
+            for _ in frames:
+                self.metrics_collector.record_execution(
+                    plugin_name, duration_ms / len(frames))
+            self._record_frame_counters(plugin, counters_before)
+            return results
+        except Exception:
+            self.metrics_collector.record_error(plugin_name)
+            raise
+
+    def _record_frame_counters(self, plugin: AnalyzerPlugin, counters_before: Tuple[int, int]) -> None:
+        """Report frames the plugin gated or reused during the call."""
+        plugin_name = plugin.__class__.__name__
+        gated = plugin.gated_frames - counters_before[0]
+        reused = plugin.reused_frames - counters_before[1]
+        if gated > 0:
+            self.metrics_collector.record_gated(plugin_name, gated)
+        if reused > 0:
+            self.metrics_collector.record_reused(plugin_name, reused)
+
+    def get_plugin(self, name: str) -> Optional[AnalyzerPlugin]:
+        """Return a loaded plugin by class name."""
+        for plugin in self.plugins:
+            if plugin.__class__.__name__ == name:
+                return plugin
+        return None
+
     def get_metrics(self) -> List[Dict]:
         """Get plugin performance metrics."""
         metrics = self.metrics_collector.get_metrics()
@@ -190,4 +524,8 @@ class PluginManager:
                 plugin.cleanup_models()
             except Exception as e:
                 logger.error(
-                    f"Failed to load {plugin.__class__.__name__} models: {e}")
\ No newline at end of file
+                    f"Failed to load {plugin.__class__.__name__} models: {e}")
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
\ No newline at end of file
@@ -1,5 +1,7 @@
 """Frame extraction and preprocessing."""
-from typing import Iterator, Tuple, Dict, Union
+from typing import Iterator, Tuple, Dict, Union, Optional
+from threading import Thread, Event
+import queue
 import numpy as np
 import av
 import time
@@ -7,11 +9,39 @@ import time
 from core.config import AnalysisConfig
 from core.errors import AnalysisError
 from services.logger import get_logger
-import time
+from utils.frame_views import VideoFrame
 
 logger = get_logger(__name__)
 
 
+_END_OF_STREAM = object()
+
+
+class FullResolutionFrame:
+    """
+    Lazy handle on a decoded frame at its original resolution.
+
+    The BGR array is only materialised on the first `to_ndarray()` call, so
+    frames that never need a full-resolution crop cost no extra conversion.
+    """
+
+    def __init__(self, frame: "av.VideoFrame"):
+        self._frame = frame
+        self._array: Optional[np.ndarray] = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        if self._array is not None:
+            return self._array.shape[:2]
+        return self._frame.height, self._frame.width
+
+    def to_ndarray(self) -> np.ndarray:
+        if self._array is None:
+            self._array = self._frame.to_ndarray(format="bgr24")
+            self._frame = None
+        return self._array
+
+
 class FrameProcessor:
     """Extracts and preprocesses video frames."""
 
@@ -96,10 +126,14 @@ class FrameProcessor:
         video_path: str,
         job_id: str,
         cancel_flag=None,
+        sample_interval_seconds: Optional[float] = None,
+        target_resolution_height: Optional[int] = None,
+        keep_full_resolution: bool = True,
     ) -> Iterator[Dict[str, Union[np.ndarray, int, float, Tuple[int, int]]]]:
 
         start_total = time.time()
         container = None
+        target_height = target_resolution_height or self.config.target_resolution_height
 
         try:
             container = self._open_container(video_path)
@@ -119,7 +153,10 @@ class FrameProcessor:
 
             video_duration_seconds = total_video_frames / fps
 
-            if video_duration_seconds < 90:
+            if sample_interval_seconds is not None:
+                # An explicit per-job interval applies regardless of duration
+                sample_interval = max(1, int(fps * sample_interval_seconds))
+            elif video_duration_seconds < 90:
                 sample_interval = max(1, int(fps))
             else:
                 sample_interval = max(1, int(fps * self.config.sample_interval_seconds))
@@ -158,36 +195,23 @@ class FrameProcessor:
                     timestamp_sec = float(frame.pts * frame.time_base)
 
                     start_decode = time.time()
-                    img = frame.to_ndarray(format="bgr24")
-                    original_h, original_w = img.shape[:2]
-
-                    if original_h > self.config.target_resolution_height:
-                        target_h = self.config.target_resolution_height
-                        target_w = int(original_w * (target_h / original_h))
-                        frame = frame.reformat(width=target_w, height=target_h, format="bgr24")
-                        img = frame.to_ndarray(format="bgr24")
-                        scale_factor = original_h / target_h
-                    else:
-                        scale_factor = 1.0
-
+                    frame_data = self._prepare_frame(frame, target_height, keep_full_resolution)
                     self.metrics["frame_decode_time"] += time.time() - start_decode
 
                     sampled_frame_number += 1
 
-                    yield {
-                        'frame': img,
+                    frame_data.update({
                         'timestamp_ms': round(timestamp_sec * 1000),
                         'end_timestamp_ms': round((timestamp_sec + sample_interval_sec) * 1000),
                         'frame_idx': frame.pts,
-                        'scale_factor': scale_factor,
-                        'original_size': (original_w, original_h),
                         'job_id': job_id,
                         'total_frames': total_sampled_frames,
                         'total_video_frames': total_video_frames,
                         'fps': fps,
                         'sample_interval': sample_interval,
                         'sampled_frame_number': sampled_frame_number
-                    }
+                    })
+                    yield frame_data
 
             else:
                 FRAME_DECODE_TIMEOUT = 15
@@ -226,38 +250,25 @@ class FrameProcessor:
                                 continue
 
                             start_decode = time.time()
-                            img = frame.to_ndarray(format="bgr24")
-                            original_h, original_w = img.shape[:2]
-
-                            if original_h > self.config.target_resolution_height:
-                                target_h = self.config.target_resolution_height
-                                target_w = int(original_w * (target_h / original_h))
-                                frame = frame.reformat(width=target_w, height=target_h, format="bgr24")
-                                img = frame.to_ndarray(format="bgr24")
-                                scale_factor = original_h / target_h
-                            else:
-                                scale_factor = 1.0
-
+                            frame_data = self._prepare_frame(frame, target_height, keep_full_resolution)
                             self.metrics["frame_decode_time"] += time.time() - start_decode
 
                             sampled_frame_number += 1
                             consecutive_failures = 0
                             frame_found = True
 
-                            yield {
-                                'frame': img,
+                            frame_data.update({
                                 'timestamp_ms': round(timestamp_sec * 1000),
                                 'end_timestamp_ms': round((timestamp_sec + sample_interval_sec) * 1000),
                                 'frame_idx': frame.pts,
-                                'scale_factor': scale_factor,
-                                'original_size': (original_w, original_h),
                                 'job_id': job_id,
                                 'total_frames': total_sampled_frames,
                                 'total_video_frames': total_video_frames,
                                 'fps': fps,
                                 'sample_interval': sample_interval,
                                 'sampled_frame_number': sampled_frame_number
-                            }
+                            })
+                            yield frame_data
 
                             break
 
@@ -290,6 +301,124 @@ class FrameProcessor:
                 except Exception:
                     pass
                     
+    def _prepare_frame(
+        self,
+        frame: "av.VideoFrame",
+        target_height: int,
+        keep_full_resolution: bool = True
+    ) -> Dict:
+        """Convert a decoded frame to BGR, downscaled to `target_height` if taller.
+
+        When the frame is downscaled, `keep_full_resolution_frames` is on and
+        the job asks for it (`keep_full_resolution`, i.e. a plugin of the job
+        reads it), a lazy handle on the decoded frame is kept under `source_frame`.
+        """
+        original_w, original_h = frame.width, frame.height
+
+        if original_h > target_height:
+            target_h = target_height
+            target_w = int(original_w * (target_h / original_h))
+            img = frame.reformat(width=target_w, height=target_h, format="bgr24").to_ndarray()
+            scale_factor = original_h / target_h
+        else:
+            img = frame.to_ndarray(format="bgr24")
+            scale_factor = 1.0
+
+        frame_data = {
+            'frame': VideoFrame(img),
+            'scale_factor': scale_factor,
+            'original_size': (original_w, original_h),
+        }
+        if scale_factor != 1.0 and keep_full_resolution and self.config.keep_full_resolution_frames:
+            frame_data['source_frame'] = FullResolutionFrame(frame)
+        return frame_data
+
+    def extract_frames_pipelined(
+        self,
+        video_path: str,
+        job_id: str,
+        cancel_flag: Optional[Event] = None,
+        sample_interval_seconds: Optional[float] = None,
+        target_resolution_height: Optional[int] = None,
+        keep_full_resolution: bool = True,
+    ) -> Iterator[Dict[str, Union[np.ndarray, int, float, Tuple[int, int]]]]:
+        """Decode frames on a producer thread so decoding overlaps plugin inference.
+
+        Frames are handed over through a queue bounded by `frame_buffer_limit`,
+        so the decoder blocks once it is that far ahead of the consumer.
+        Cancellation (either `cancel_flag` or the consumer closing this
+        generator) stops the producer at its next frame boundary, even while
+        the consumer is busy and not pulling frames; callers should close the
+        generator when they stop early so the producer is joined right away.
+        """
+        frame_queue: "queue.Queue" = queue.Queue(
+            maxsize=max(1, self.config.frame_buffer_limit))
+        stop_flag = Event()
+
+        def _stopped() -> bool:
+            if cancel_flag and cancel_flag.is_set():
+                stop_flag.set()
+            return stop_flag.is_set()
+
+        def _put(item) -> bool:
+            """Blocking put that gives up once the pipeline is stopped or the job cancelled."""
+            while not _stopped():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _produce() -> None:
+            try:
+                for frame_data in self.extract_frames_streaming(
+                        video_path, job_id, cancel_flag=stop_flag,
+                        sample_interval_seconds=sample_interval_seconds,
+                        target_resolution_height=target_resolution_height,
+                        keep_full_resolution=keep_full_resolution):
+                    if _stopped() or not _put(frame_data):
+                        return
+            except Exception as e:
+                _put(e)
+                return
+            _put(_END_OF_STREAM)
+
+        producer = Thread(
+            target=_produce, name=f"frame-decoder-{job_id}", daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                try:
+                    item = frame_queue.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+
+                if cancel_flag and cancel_flag.is_set():
+                    return
+                if item is None:
+                    if not producer.is_alive() and frame_queue.empty():
+                        return
+                    continue
+
+                if item is _END_OF_STREAM:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop_flag.set()
+            # Unblock a producer waiting on a full queue
+            while True:
+                try:
+                    frame_queue.get_nowait()
+                except queue.Empty:
+                    break
+            producer.join(timeout=5)
+            if producer.is_alive():
+                logger.warning(f"[{job_id}] Frame decoder thread did not stop in time")
+
     def get_metrics(self) -> Dict[str, float]:
         """Return extraction performance metrics."""
         return self.metrics.copy()
\ No newline at end of file
@@ -53,18 +53,23 @@ class ResultBuilder:
         memory_stats: Dict,
         processing_time: float,
         stage_metrics: List[Dict],
+        object_tracks: Optional[List[Dict]] = None,
     ) -> VideoAnalysisResult:
         """Build a successful analysis result."""
+        summary = {
+            "total_frames_analyzed": len(frame_analyses),
+            "total_analysis_time_seconds": round(processing_time, 2),
+            "peak_memory_mb": memory_stats.get('peak_mb', 0),
+            "memory_cleanups": memory_stats.get('cleanup_count', 0),
+            "processing_time": processing_time
+        }
+        if object_tracks is not None:
+            summary["object_tracks"] = object_tracks
+
         return VideoAnalysisResult(
             video_file=video_path,
             frame_analysis=frame_analyses,
-            summary={
-                "total_frames_analyzed": len(frame_analyses),
-                "total_analysis_time_seconds": round(processing_time, 2),
-                "peak_memory_mb": memory_stats.get('peak_mb', 0),
-                "memory_cleanups": memory_stats.get('cleanup_count', 0),
-                "processing_time": processing_time
-            },
+            summary=summary,
             performance_metrics=[asdict(m) for m in performance_metrics],
             plugin_performance=plugin_metrics,
             stage_metrics=stage_metrics
@@ -1,11 +1,14 @@
 """Video analysis service."""
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, Dict
 from pathlib import Path
 from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from contextlib import closing
 import time
 
 from core.types import AnalysisRequest, FrameAnalysis, AnalysisCancelledError
-from core.config import AnalysisConfig
+from core.config import AnalysisConfig, AnalysisPlan
 from core.errors import AnalysisError
 from services.base_service import BaseProcessingService
 from services.analysis.processor import FrameProcessor
@@ -14,6 +17,7 @@ from services.analysis.result import VideoAnalysisResult, ResultBuilder
 from monitoring.metrics import PerformanceMetrics, StageTimer, StageMetricsCollector
 from services.logger import get_logger
 from utils.progress import ThrottledProgress
+from utils.frame_views import get_view
 import os
 import numpy as np
 import cv2
@@ -38,6 +42,8 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
         self.performance_metrics: List[PerformanceMetrics] = []
         self.metrics_collector = StageMetricsCollector()
         self._cancel_flags: dict[str, Event] = {}
+        # Rematch requests are quick; they get their own thread instead of queueing behind analyses
+        self.rematch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rematch")
 
     def cancel(self, job_id: str) -> None:
         """Signal a running analysis job to stop."""
@@ -49,6 +55,26 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
             logger.info(
                 f"Pre-cancelling analysis job {job_id} (not yet started)")
 
+    async def rematch_faces_async(self, names: Optional[List[str]] = None) -> List[Dict]:
+        """Match stored unknown face embeddings against known faces on the rematch thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.rematch_executor, self.rematch_faces, names)
+
+    def rematch_faces(self, names: Optional[List[str]] = None) -> List[Dict]:
+        """Reassign stored unknown faces that now match a known face.
+
+        The plugin serialises this with the unknown face writes of a running analysis.
+        """
+        plugin = self.plugin_manager.get_plugin("FaceRecognitionPlugin")
+        if plugin is None:
+            raise AnalysisError("Face recognition plugin is not loaded")
+        return plugin.rematch_unknown_faces(names)
+
+    def cleanup(self) -> None:
+        """Cleanup resources."""
+        self.rematch_executor.shutdown(wait=True)
+        super().cleanup()
+
     def _process_sync(
         self,
         request: AnalysisRequest,
@@ -61,10 +87,18 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
         self._cancel_flags[request.job_id] = cancel_flag
 
         try:
+            try:
+                plan = AnalysisPlan.from_settings(request.settings)
+            except ValueError as e:
+                raise AnalysisError(f"Invalid analysis settings: {e}")
+
             # Setup plugins
             with StageTimer("plugin_setup") as timer:
-                self.plugin_manager.setup_plugins(
-                    request.video_path, request.job_id)
+                try:
+                    self.plugin_manager.setup_plugins(
+                        request.video_path, request.job_id, plan)
+                except ValueError as e:
+                    raise AnalysisError(f"Invalid analysis settings: {e}")
             self._record_stage_metric(timer)
             self.metrics_collector.record_execution(
                 "plugin_setup", time.time() - start_time)
@@ -74,12 +108,18 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
             # Analyze frames
             frame_analyses = self._analyze_frames(
                 request,
+                plan,
                 throttled,
                 cancel_flag
             )
             self.metrics_collector.record_execution(
                 "frame_analysis", time.time() - start_time)
 
+            # Per-track time ranges, when object tracking is enabled
+            object_tracks = None
+            if "ObjectDetectionPlugin" in self.plugin_manager.enabled_plugins:
+                object_tracks = self.plugin_manager.get_plugin("ObjectDetectionPlugin").get_results()
+
             # Build result
             result = ResultBuilder.build_success_result(
                 video_path=request.video_path,
@@ -88,7 +128,8 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
                 performance_metrics=self.performance_metrics,
                 memory_stats=self.memory_monitor.get_stats() if self.memory_monitor else {},
                 processing_time=time.time() - start_time,
-                stage_metrics=self.metrics_collector.get_metrics()
+                stage_metrics=self.metrics_collector.get_metrics(),
+                object_tracks=object_tracks
             )
 
             # Reset plugin metrics after each video has been processed
@@ -113,6 +154,7 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
     def _analyze_frames(
         self,
         request: AnalysisRequest,
+        plan: AnalysisPlan,
         progress_callback: Optional[ThrottledProgress],
         cancel_flag: Event
     ) -> List[FrameAnalysis]:
@@ -124,11 +166,85 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
         total_frames_estimate = None
         frames_processed = 0
 
+        # Full-resolution frames are only kept when a plugin of this job crops from them
+        keep_full_resolution = self.plugin_manager.needs_source_frames()
+
         with StageTimer("frame_analysis") as timer:
-            frame_generator = self.frame_processor.extract_frames_streaming(
-                request.video_path,
-                request.job_id
-            )
+            if self.config.enable_pipelined_extraction:
+                # Decode on a producer thread, bounded by frame_buffer_limit
+                frame_generator = self.frame_processor.extract_frames_pipelined(
+                    request.video_path,
+                    request.job_id,
+                    cancel_flag,
+                    sample_interval_seconds=plan.sample_interval_seconds,
+                    target_resolution_height=plan.target_resolution_height,
+                    keep_full_resolution=keep_full_resolution
+                )
+            else:
+                frame_generator = self.frame_processor.extract_frames_streaming(
+                    request.video_path,
+                    request.job_id,
+                    cancel_flag,
+                    sample_interval_seconds=plan.sample_interval_seconds,
+                    target_resolution_height=plan.target_resolution_height,
+                    keep_full_resolution=keep_full_resolution
+                )
+
+            # Closing the generator stops and joins the decoder as soon as the loop exits
+            with closing(frame_generator):
+                for frame_idx, frame_data in enumerate(frame_generator):
+                    if cancel_flag.is_set():
+                        logger.info(
+                            f"Cancellation detected at frame {frame_idx}, stopping analysis")
+                        self.plugin_manager.cleanup_plugins()
+                        raise AnalysisCancelledError()
+
+                    # Get total frames from first frame
+                    if total_frames_estimate is None:
+                        total_frames_estimate = frame_data.get('total_frames', 0)
+
+                    # Send progress — throttled to avoid flooding the DB
+                    if progress_callback and total_frames_estimate:
+                        self._send_progress(
+                            progress_callback.update,
+                            frame_data.get('sampled_frame_number', frame_idx + 1),
+                            total_frames_estimate,
+                            time.time() - timer.start_time
+                        )
+
+                    batch.append(frame_data)
+
+                    # Process batch when buffer is full
+                    if len(batch) >= self.config.frame_buffer_limit:
+                        batch_results = self._process_batch(
+                            batch, request.video_path, cancel_flag)
+                        frame_analyses.extend(batch_results)
+                        frames_processed += len(batch_results)
+                        batch.clear()
+
+                        # Memory cleanup
+                        if self.memory_monitor:
+                            if frame_idx % self.config.memory_cleanup_interval == 0:
+                                self.memory_monitor.force_cleanup()
+
+                            if self.memory_monitor.check_memory_pressure():
+                                logger.warning("Memory pressure detected")
+                                self.memory_monitor.force_cleanup(aggressive=True)
+                                time.sleep(0.5)
+
+            # Extraction stops early once cancelled, so the loop can end without seeing the flag
+            if cancel_flag.is_set():
+                logger.info("Cancellation detected after frame extraction, stopping analysis")
+                self.plugin_manager.cleanup_plugins()
+                raise AnalysisCancelledError()
+
+            # Process remaining batch
+            if batch:
+                batch_results = self._process_batch(
+                    batch, request.video_path, cancel_flag)
+                frame_analyses.extend(batch_results)
+                frames_processed += len(batch_results)
+
             extraction_metrics = self.frame_processor.get_metrics()
 
             self.metrics_collector.record_execution(
@@ -144,53 +260,6 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
                 extraction_metrics["video_open_time"]
             )
 
-            for frame_idx, frame_data in enumerate(frame_generator):
-                if cancel_flag.is_set():
-                    logger.info(
-                        f"Cancellation detected at frame {frame_idx}, stopping analysis")
-                    self.plugin_manager.cleanup_plugins()
-                    raise AnalysisCancelledError()
-
-                # Get total frames from first frame
-                if total_frames_estimate is None:
-                    total_frames_estimate = frame_data.get('total_frames', 0)
-
-                # Send progress — throttled to avoid flooding the DB
-                if progress_callback and total_frames_estimate:
-                    self._send_progress(
-                        progress_callback.update,
-                        frame_data.get('sampled_frame_number', frame_idx + 1),
-                        total_frames_estimate,
-                        time.time() - timer.start_time
-                    )
-
-                batch.append(frame_data)
-
-                # Process batch when buffer is full
-                if len(batch) >= self.config.frame_buffer_limit:
-                    batch_results = self._process_batch(
-                        batch, request.video_path, cancel_flag)
-                    frame_analyses.extend(batch_results)
-                    frames_processed += len(batch_results)
-                    batch.clear()
-
-                    # Memory cleanup
-                    if self.memory_monitor:
-                        if frame_idx % self.config.memory_cleanup_interval == 0:
-                            self.memory_monitor.force_cleanup()
-
-                        if self.memory_monitor.check_memory_pressure():
-                            logger.warning("Memory pressure detected")
-                            self.memory_monitor.force_cleanup(aggressive=True)
-                            time.sleep(0.5)
-
-            # Process remaining batch
-            if batch:
-                batch_results = self._process_batch(batch, request.video_path)
-                frame_analyses.extend(batch_results)
-                frames_processed += len(batch_results)
-
-
         self._record_stage_metric(timer, frames_processed=len(frame_analyses))
         self.plugin_manager.cleanup_plugins()
         
@@ -214,19 +283,19 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
         cancel_flag: Optional[Event] = None 
     ) -> List[FrameAnalysis]:
         """Process a batch of frames through plugins."""
-        results: List[FrameAnalysis] = []
         video_hash = hashlib.md5(video_path.encode('utf-8')).hexdigest()
 
-        for frame_data in batch:
-            if cancel_flag and cancel_flag.is_set():
-                logger.info("Cancellation detected mid-batch, stopping")
-                raise AnalysisCancelledError()
+        if cancel_flag and cancel_flag.is_set():
+            logger.info("Cancellation detected mid-batch, stopping")
+            raise AnalysisCancelledError()
 
-            # Initialize frame analysis
+        # Initialize frame analyses
+        analyses: List[FrameAnalysis] = []
+        for frame_data in batch:
             frame_idx = frame_data['frame_idx']
             thumbnail_path = os.path.join(
                 self.config.thumbnail_dir, f"${video_hash}_{frame_idx}.jpeg")
-            analysis: FrameAnalysis = {
+            analyses.append({
                 'start_time_ms': frame_data['timestamp_ms'],
                 'end_time_ms': frame_data['end_timestamp_ms'],
                 'duration_ms': frame_data['end_timestamp_ms'] - frame_data['timestamp_ms'],
@@ -234,25 +303,29 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
                 'scale_factor': frame_data['scale_factor'],
                 'job_id': frame_data['job_id'],
                 'thumbnail_path': thumbnail_path
-            }
-
-            # Run plugins
-            analysis = self.plugin_manager.process_frame(
-                frame_data['frame'],
-                analysis,
-                frame_data['frame_idx'],
-                video_path
-            )
+            })
+            if 'source_frame' in frame_data:
+                analyses[-1]['source_frame'] = frame_data['source_frame']
+
+        # Run plugins
+        results = self.plugin_manager.process_batch(
+            [frame_data['frame'] for frame_data in batch],
+            analyses,
+            video_path,
+            cancel_flag
+        )
+
+        for frame_data, analysis in zip(batch, results):
             start_thumb = time.time()
-            self.save_frame(thumbnail_path, frame_data['frame'])
+            self.save_frame(analysis['thumbnail_path'], frame_data['frame'])
             self.metrics_collector.record_execution(
                 "thumbnail_extraction", time.time() - start_thumb)
 
-            results.append(analysis)
-
-        # Cleanup frames from memory
-        for frame_data in batch:
+        # Cleanup frames from memory; the full-resolution handle must not reach the results
+        for frame_data, analysis in zip(batch, results):
             frame_data.pop('frame', None)
+            frame_data.pop('source_frame', None)
+            analysis.pop('source_frame', None)
 
         return results
 
@@ -334,16 +407,7 @@ class AnalysisService(BaseProcessingService[AnalysisRequest, VideoAnalysisResult
         try:
             os.makedirs(self.config.thumbnail_dir, exist_ok=True)
 
-            h, w = frame.shape[:2]
-            target_width = 320
-            scale = target_width / w
-            target_height = int(h * scale)
-
-            resized_frame = cv2.resize(
-                frame,
-                (target_width, target_height),
-                interpolation=cv2.INTER_AREA
-            )
+            resized_frame = get_view(frame, "thumbnail")
 
             cv2.imwrite(thumbnail_path, resized_frame,
                         [cv2.IMWRITE_JPEG_QUALITY, 85])
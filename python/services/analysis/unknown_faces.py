@@ -0,0 +1,436 @@
+"""Registries of unknown face clusters."""
+from services.logger import get_logger
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import os
+import threading
+
+logger = get_logger(__name__)
+
+# Unknown_XXX numbers persisted ahead of use, so IDs survive a crash between flushes
+ID_RESERVE_BLOCK = 64
+
+
+class UnknownFaceRegistry:
+    """
+    Unknown face clusters stored as a contiguous float32 matrix.
+
+    Each row holds the running-mean centroid of one Unknown_XXX cluster, next to
+    a pre-normalised copy used for search, so finding the closest cluster is a
+    single matrix-vector product regardless of how many clusters exist.
+    Capacity grows geometrically, so appending a cluster is amortised O(1).
+
+    Args:
+        initial_capacity (int): Number of rows allocated up front
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        self.initial_capacity = initial_capacity
+        self.ids: List[str] = []
+        self._centroids = np.empty((0, 0), dtype=np.float32)
+        self._unit = np.empty((0, 0), dtype=np.float32)
+        self._counts = np.empty((0,), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def reset(self) -> None:
+        self.ids = []
+        self._centroids = np.empty((0, 0), dtype=np.float32)
+        self._unit = np.empty((0, 0), dtype=np.float32)
+        self._counts = np.empty((0,), dtype=np.int64)
+
+    def search(self, embedding: np.ndarray) -> Optional[Tuple[int, float]]:
+        """Return (row, cosine similarity) of the closest cluster, if any."""
+        size = len(self.ids)
+        if size == 0:
+            return None
+
+        query = self._normalize(embedding)
+        similarities = self._unit[:size] @ query
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def add(self, face_id: str, embedding: np.ndarray) -> int:
+        """Register a new cluster and return its row."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        row = len(self.ids)
+        self._ensure_capacity(row + 1, vector.shape[0])
+
+        self._centroids[row] = vector
+        self._unit[row] = self._normalize(vector)
+        self._counts[row] = 1
+        self.ids.append(face_id)
+        return row
+
+    def update(self, row: int, embedding: np.ndarray) -> int:
+        """Fold an embedding into a cluster's running mean; returns its appearance count."""
+        self._counts[row] += 1
+        centroid = self._centroids[row]
+        centroid += (np.asarray(embedding, dtype=np.float32) - centroid) / self._counts[row]
+        self._unit[row] = self._normalize(centroid)
+        return int(self._counts[row])
+
+    def appearances(self, row: int) -> int:
+        return int(self._counts[row])
+
+    def centroid(self, row: int) -> np.ndarray:
+        return self._unit[row].copy()
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        capacity = self._centroids.shape[0]
+        if rows <= capacity and self._centroids.shape[1] == dim:
+            return
+
+        new_capacity = max(self.initial_capacity, capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+
+        size = len(self.ids)
+        centroids = np.zeros((new_capacity, dim), dtype=np.float32)
+        unit = np.zeros((new_capacity, dim), dtype=np.float32)
+        counts = np.zeros((new_capacity,), dtype=np.int64)
+        if size:
+            centroids[:size] = self._centroids[:size]
+            unit[:size] = self._unit[:size]
+            counts[:size] = self._counts[:size]
+
+        self._centroids, self._unit, self._counts = centroids, unit, counts
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+class PersistentUnknownFaceStore:
+    """
+    Library-wide unknown face clusters shared by every analysis job.
+
+    Cluster embeddings live in a memory-mapped float32 file
+    (`embeddings.f32`, one row per cluster holding the sum of its member
+    embeddings, whose direction is the running-mean centroid), next to a
+    compact index (`index.npz`) with the cluster IDs, appearance counts and
+    the next free Unknown_XXX number. Only row norms are kept in memory, so
+    the same person gets the same ID across videos without holding every
+    embedding in RAM.
+
+    The store is bounded: once it holds `max_clusters` clusters, the least
+    seen tenth is dropped (their Unknown_XXX numbers are never reused).
+    Callers batch `flush()`; ID numbers are reserved on disk in blocks so a
+    crash between flushes can't hand the same ID out twice.
+
+    Args:
+        store_dir (str): Directory holding the store files
+        initial_capacity (int): Rows allocated when the store is created
+        max_clusters (int): Cluster count that triggers pruning
+    """
+
+    EMBEDDINGS_FILE = "embeddings.f32"
+    INDEX_FILE = "index.npz"
+
+    def __init__(self, store_dir: str, initial_capacity: int = 1024, max_clusters: int = 20000):
+        self.store_dir = Path(store_dir)
+        self.initial_capacity = initial_capacity
+        self.max_clusters = max_clusters
+        self.ids: List[str] = []
+        self.next_number = 0
+        self._reserved_number = 0
+        self._dim = 0
+        self._capacity = 0
+        self._sums: Optional[np.memmap] = None
+        self._norms = np.empty((0,), dtype=np.float32)
+        self._counts = np.empty((0,), dtype=np.int64)
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self) -> None:
+        """Open the store on disk, if it exists."""
+        with self._lock:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            index_path = self.store_dir / self.INDEX_FILE
+            if not index_path.exists():
+                return
+
+            with np.load(index_path, allow_pickle=False) as data:
+                self.ids = data["ids"].tolist()
+                counts = data["counts"].astype(np.int64)
+                self.next_number = int(data["next_number"])
+                self._reserved_number = self.next_number
+                self._dim = int(data["dim"])
+                self._capacity = int(data["capacity"])
+
+            size = len(self.ids)
+            if self._capacity == 0:
+                # Only the ID counter was persisted so far
+                return
+
+            self._open_memmap()
+            self._counts = np.zeros((self._capacity,), dtype=np.int64)
+            self._counts[:size] = counts
+            self._norms = np.zeros((self._capacity,), dtype=np.float32)
+            self._norms[:size] = np.linalg.norm(self._sums[:size], axis=1)
+
+            logger.info(
+                f"Loaded unknown face store: {size} clusters from {self.store_dir}")
+
+    def next_face_id(self) -> str:
+        with self._lock:
+            face_id = f"Unknown_{self.next_number:03d}"
+            self.next_number += 1
+            self._dirty = True
+            if self.next_number > self._reserved_number:
+                self._reserved_number = self.next_number + ID_RESERVE_BLOCK
+                self.flush()
+            return face_id
+
+    def search(self, embedding: np.ndarray) -> Optional[Tuple[int, float]]:
+        """Return (row, cosine similarity) of the closest cluster, if any."""
+        with self._lock:
+            size = len(self.ids)
+            if size == 0 or self._sums is None:
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query)
+            if query_norm == 0:
+                return None
+
+            norms = np.maximum(self._norms[:size], 1e-12)
+            similarities = (self._sums[:size] @ query) / (norms * query_norm)
+            best = int(np.argmax(similarities))
+            return best, float(similarities[best])
+
+    def add(self, face_id: str, embedding: np.ndarray) -> int:
+        """Register a new cluster and return its row."""
+        with self._lock:
+            vector = self._unit(embedding)
+            if self.max_clusters and len(self.ids) >= self.max_clusters:
+                self._prune(int(self.max_clusters * 0.9))
+            row = len(self.ids)
+            self._ensure_capacity(row + 1, vector.shape[0])
+
+            self._sums[row] = vector
+            self._norms[row] = np.linalg.norm(vector)
+            self._counts[row] = 1
+            self.ids.append(face_id)
+            self._dirty = True
+            return row
+
+    def update(self, row: int, embedding: np.ndarray) -> int:
+        """Fold an embedding into a cluster; returns its appearance count."""
+        with self._lock:
+            self._sums[row] += self._unit(embedding)
+            self._norms[row] = np.linalg.norm(self._sums[row])
+            self._counts[row] += 1
+            self._dirty = True
+            return int(self._counts[row])
+
+    def appearances(self, row: int) -> int:
+        return int(self._counts[row])
+
+    def centroid(self, row: int) -> np.ndarray:
+        with self._lock:
+            return self._unit(self._sums[row])
+
+    def flush(self) -> None:
+        """Persist embeddings and the ID index."""
+        with self._lock:
+            if not self._dirty:
+                return
+
+            # IDs may have been handed out before any embedding was stored
+            if self._sums is not None:
+                self._sums.flush()
+            size = len(self.ids)
+            tmp_path = self.store_dir / "index.tmp.npz"
+            np.savez(
+                tmp_path,
+                ids=np.array(self.ids, dtype=str),
+                counts=self._counts[:size],
+                next_number=np.int64(max(self.next_number, self._reserved_number)),
+                dim=np.int64(self._dim),
+                capacity=np.int64(self._capacity),
+            )
+            os.replace(tmp_path, self.store_dir / self.INDEX_FILE)
+            self._dirty = False
+
+    def _prune(self, keep_count: int) -> None:
+        """Keep the `keep_count` most seen clusters (newest first on ties), compacting the rows."""
+        size = len(self.ids)
+        if size <= keep_count:
+            return
+
+        # Stable sort on -count keeps later (newer) rows ahead among equal counts
+        order = np.argsort(-self._counts[:size][::-1], kind="stable")
+        keep = np.sort(size - 1 - order[:keep_count])
+
+        self._sums[:keep_count] = self._sums[keep]
+        self._norms[:keep_count] = self._norms[keep]
+        self._counts[:keep_count] = self._counts[keep]
+        self._counts[keep_count:size] = 0
+        self.ids = [self.ids[row] for row in keep]
+        self._dirty = True
+        logger.info(
+            f"Pruned unknown face store from {size} to {keep_count} clusters")
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if self._sums is None:
+            self._dim = dim
+        elif dim != self._dim:
+            raise ValueError(
+                f"Embedding size {dim} does not match unknown face store ({self._dim})")
+
+        if rows <= self._capacity and self._sums is not None:
+            return
+
+        new_capacity = max(self.initial_capacity, self._capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+
+        # Grow the backing file in place, then remap it
+        if self._sums is not None:
+            self._sums.flush()
+            self._sums = None
+        path = self.store_dir / self.EMBEDDINGS_FILE
+        with open(path, "ab") as f:
+            f.truncate(new_capacity * self._dim * np.dtype(np.float32).itemsize)
+        self._capacity = new_capacity
+        self._open_memmap()
+
+        size = len(self.ids)
+        counts = np.zeros((new_capacity,), dtype=np.int64)
+        norms = np.zeros((new_capacity,), dtype=np.float32)
+        counts[:size] = self._counts[:size]
+        norms[:size] = self._norms[:size]
+        self._counts, self._norms = counts, norms
+
+    def _open_memmap(self) -> None:
+        self._sums = np.memmap(
+            self.store_dir / self.EMBEDDINGS_FILE,
+            dtype=np.float32,
+            mode="r+",
+            shape=(self._capacity, self._dim)
+        )
+
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+class UnknownFaceEmbeddingIndex:
+    """
+    Embeddings saved with the unknown face files of every analysed video.
+
+    Each saved unknown face has a float16 `<base>.npy` under
+    `<unknown_faces_dir>/.embeddings/` matching its `<base>.json`. The index
+    loads new files incrementally and forgets those whose JSON is gone (the
+    face was labelled or deleted), so matching known people against every
+    stored unknown face is one matrix product instead of re-analysing videos.
+
+    Args:
+        unknown_faces_dir (str): Folder holding the unknown face JSON files
+    """
+
+    EMBEDDINGS_DIR = ".embeddings"
+
+    def __init__(self, unknown_faces_dir: str):
+        self.unknown_faces_dir = Path(unknown_faces_dir)
+        self.embeddings_dir = self.unknown_faces_dir / self.EMBEDDINGS_DIR
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._mtimes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def embedding_path(self, base_filename: str) -> Path:
+        return self.embeddings_dir / f"{base_filename}.npy"
+
+    def save(self, base_filename: str, embedding: np.ndarray) -> Path:
+        """Write a face embedding as float16, replacing any previous one."""
+        self.embeddings_dir.mkdir(parents=True, exist_ok=True)
+        path = self.embedding_path(base_filename)
+        tmp_path = path.with_name(f"{path.stem}.tmp.npy")
+        np.save(tmp_path, np.asarray(embedding, dtype=np.float16))
+        os.replace(tmp_path, path)
+        return path
+
+    def refresh(self) -> None:
+        """Load added or rewritten embeddings and drop removed or orphaned ones."""
+        current: Dict[str, int] = {}
+        if self.embeddings_dir.is_dir():
+            for entry in os.scandir(self.embeddings_dir):
+                if entry.is_file() and entry.name.endswith(".npy") and ".tmp." not in entry.name:
+                    current[entry.name[:-len(".npy")]] = entry.stat().st_mtime_ns
+
+        for base in list(self._vectors):
+            if base not in current:
+                self._vectors.pop(base, None)
+                self._mtimes.pop(base, None)
+
+        for base, mtime in current.items():
+            if not (self.unknown_faces_dir / f"{base}.json").exists():
+                # Labelled or deleted face, its embedding is no longer needed
+                self.embedding_path(base).unlink(missing_ok=True)
+                self._vectors.pop(base, None)
+                self._mtimes.pop(base, None)
+                continue
+            if self._mtimes.get(base) == mtime:
+                continue
+            try:
+                vector = np.load(self.embedding_path(base)).astype(np.float32)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable unknown face embedding {base}: {e}")
+                continue
+            norm = np.linalg.norm(vector)
+            self._vectors[base] = vector / norm if norm > 0 else vector
+            self._mtimes[base] = mtime
+
+    def match(
+        self,
+        known_embeddings: np.ndarray,
+        known_labels: np.ndarray,
+        tolerance: float,
+        names: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """Assign stored unknown faces to the closest known face within `tolerance`.
+
+        `known_embeddings` must be unit rows; `names` restricts matching to
+        those known people. Returns one reassignment per matched unknown face.
+        """
+        with self._lock:
+            self.refresh()
+            if names is not None:
+                keep = np.isin(known_labels, list(names))
+                known_embeddings, known_labels = known_embeddings[keep], known_labels[keep]
+            if len(known_labels) == 0 or not self._vectors:
+                return []
+
+            dim = known_embeddings.shape[1]
+            bases = [base for base, vector in self._vectors.items() if vector.shape[0] == dim]
+            if not bases:
+                return []
+            unknown = np.stack([self._vectors[base] for base in bases])
+
+        similarities = unknown @ known_embeddings.T
+        best = similarities.argmax(axis=1)
+        distances = 1.0 - similarities[np.arange(len(bases)), best]
+
+        reassignments = []
+        for base, known_row, distance in zip(bases, best, distances):
+            if distance > tolerance:
+                continue
+            reassignments.append({
+                "face_id": base.rsplit("_", 1)[0],
+                "json_file": f"{base}.json",
+                "image_file": f"{base}.jpg",
+                "name": str(known_labels[known_row]),
+                "confidence": float(max(0.0, 1.0 - distance) * 100),
+                "distance": float(distance),
+            })
+        return reassignments
@@ -389,4 +389,44 @@ class MessageHandlers:
             MessageType.ANALYSIS_COMPLETED,
             {"message": "Analysis cancelled", "cancelled": True, 'job_id': job_id},
             job_id=job_id
-        )
\ No newline at end of file
+        )
+
+    async def handle_rematch_faces(
+        self,
+        websocket: WebSocketServerProtocol,
+        payload: JsonDict
+    ) -> None:
+        """Handle a request to match stored unknown faces against known faces.
+
+        Optional `names` limits matching to those known people (e.g. the one
+        just labelled); the reply lists the unknown faces that now match.
+        """
+        job_id = payload.get('job_id')
+        names = payload.get('names')
+
+        if names is not None and (
+                not isinstance(names, list) or not all(isinstance(n, str) for n in names)):
+            await self.connection_manager.send_message(
+                websocket,
+                MessageType.ERROR,
+                {"message": "names must be a list of strings"}
+            )
+            return
+
+        try:
+            reassignments = await self.analysis_service.rematch_faces_async(names)
+            logger.info(f"Face rematch found {len(reassignments)} reassignments")
+
+            await self.connection_manager.send_message(
+                websocket,
+                MessageType.REMATCH_FACES_COMPLETED,
+                {"reassignments": reassignments},
+                job_id=job_id
+            )
+        except Exception as e:
+            logger.exception("Face rematch failed")
+            await self.connection_manager.send_message(
+                websocket,
+                MessageType.ERROR,
+                {"message": f"Face rematch failed: {str(e)}"}
+            )
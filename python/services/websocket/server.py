@@ -85,6 +85,10 @@ class WebSocketServer:
         self.message_router.register_handler(
             MessageType.CANCEL_ANALYSIS,
             self.message_handlers.handle_cancel_analysis
+        )
+        self.message_router.register_handler(
+            MessageType.REMATCH_FACES,
+            self.message_handlers.handle_rematch_faces
         )     
 
     async def handle_connection(self, websocket: ServerConnection) -> None:
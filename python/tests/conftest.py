@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Service modules are imported from the python/ folder, as main.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
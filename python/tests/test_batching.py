@@ -0,0 +1,72 @@
+from utils.batching import AdaptiveBatchSize
+
+
+def run(batcher, latency_per_item, calls=20, pending=1000):
+    """Drive the batcher with a fixed per-item latency for each batch size."""
+    sizes = []
+    for _ in range(calls):
+        size = batcher.next_size(pending)
+        batcher.record(size, latency_per_item(size) * size)
+        sizes.append(size)
+    return sizes
+
+
+def test_grows_while_larger_batches_are_faster():
+    batcher = AdaptiveBatchSize(max_batch_size=32)
+    sizes = run(batcher, lambda size: 1.0 / size)
+    assert sizes[:6] == [1, 2, 4, 8, 16, 32]
+    assert set(sizes[6:]) == {32}
+
+
+def test_settles_on_fastest_measured_size():
+    batcher = AdaptiveBatchSize(max_batch_size=64)
+    # Per-item latency is lowest at 8 and rises again beyond it
+    sizes = run(batcher, lambda size: {1: 1.0, 2: 0.6, 4: 0.4, 8: 0.3}.get(size, 0.5))
+    assert 16 in sizes
+    assert sizes[-1] == 8
+    assert max(sizes) == 16
+
+
+def test_never_exceeds_pending_items():
+    batcher = AdaptiveBatchSize(max_batch_size=16, initial=16)
+    assert batcher.next_size(pending=3) == 3
+
+
+def test_partial_batches_are_recorded_under_their_size():
+    batcher = AdaptiveBatchSize(max_batch_size=16, initial=4)
+    batcher.next_size(pending=100)
+    batcher.record(2, 1.0)
+    assert batcher.latency_per_item == {2: 0.5}
+
+
+def test_adapts_when_batches_are_shorter_than_current():
+    batcher = AdaptiveBatchSize(max_batch_size=32, initial=16)
+    # Callers only ever have 3 frames at a time
+    sizes = run(batcher, lambda size: 1.0 / size, pending=3)
+    assert set(sizes) == {3}
+    assert batcher.current == 3
+    assert batcher.latency_per_item
+
+    # Larger batches showing up later resume the growth from there
+    sizes = run(batcher, lambda size: 1.0 / size, pending=100)
+    assert sizes[:3] == [6, 12, 24]
+    assert sizes[-1] == 24
+
+
+def test_does_not_grow_past_the_largest_batch_seen():
+    batcher = AdaptiveBatchSize(max_batch_size=32)
+    sizes = run(batcher, lambda size: 1.0 / size, pending=2)
+    assert max(sizes) == 2
+    assert batcher.current == 2
+
+
+def test_memory_caps_batch_size(monkeypatch):
+    monkeypatch.setattr(AdaptiveBatchSize, "_available_memory", staticmethod(lambda device: 1000))
+    batcher = AdaptiveBatchSize(max_batch_size=64, bytes_per_item=100, memory_fraction=0.5, initial=64)
+    assert batcher.next_size(pending=100) == 5
+
+
+def test_unknown_memory_falls_back_to_max(monkeypatch):
+    monkeypatch.setattr(AdaptiveBatchSize, "_available_memory", staticmethod(lambda device: None))
+    batcher = AdaptiveBatchSize(max_batch_size=8, bytes_per_item=100, initial=8)
+    assert batcher.next_size(pending=100) == 8
@@ -0,0 +1,41 @@
+import numpy as np
+
+from plugins.config.colors import COLOR_NAMES, get_color_name, get_color_names, rgb_to_hex
+
+KNOWN = np.array(list(COLOR_NAMES.keys()), dtype=np.int64)
+NAMES = list(COLOR_NAMES.values())
+# A quantised cell centre is at most this far from any color in the cell
+QUANTISATION_ERROR = np.sqrt(3 * 2 ** 2)
+
+
+def nearest_distance(rgb):
+    return np.sqrt(((KNOWN - rgb) ** 2).sum(axis=1)).min()
+
+
+def name_distance(rgb, name):
+    rows = [i for i, known_name in enumerate(NAMES) if known_name == name]
+    return np.sqrt(((KNOWN[rows] - rgb) ** 2).sum(axis=1)).min()
+
+
+def test_primary_colors():
+    assert get_color_names(np.array([[255, 0, 0], [0, 0, 0], [255, 255, 255]])) == [
+        "Red", "Black", "White"]
+
+
+def test_lookup_is_close_to_exact_nearest_color():
+    rgbs = np.random.default_rng(0).integers(0, 256, size=(2000, 3))
+    names = get_color_names(rgbs)
+
+    for rgb, name in zip(rgbs, names):
+        assert name_distance(rgb, name) <= nearest_distance(rgb) + 2 * QUANTISATION_ERROR
+
+
+def test_accepts_float_and_out_of_range_values():
+    assert get_color_names(np.array([[254.6, -3.0, 10.2], [300, 300, 300]])) == get_color_names(
+        np.array([[254, 0, 10], [255, 255, 255]]))
+
+
+def test_single_color_helpers():
+    assert get_color_name((255, 0, 0)) == "Red"
+    assert get_color_name((12, 200, 30)) == get_color_names(np.array([[12, 200, 30]]))[0]
+    assert rgb_to_hex((255, 0, 16)) == "#ff0010"
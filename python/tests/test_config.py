@@ -0,0 +1,53 @@
+import pytest
+
+from core.config import AnalysisPlan
+
+
+def test_empty_settings_use_defaults():
+    for settings in (None, {}):
+        plan = AnalysisPlan.from_settings(settings)
+        assert plan == AnalysisPlan()
+        assert plan.plugins is None
+        assert plan.enable_ocr and plan.enable_captions and plan.enable_emotion
+
+
+def test_valid_settings_are_applied():
+    plan = AnalysisPlan.from_settings({
+        "plugins": ["objects", "FaceRecognitionPlugin"],
+        "sample_interval_seconds": 2,
+        "target_resolution_height": 480,
+        "ocr": False,
+        "captions": False,
+        "emotion": False,
+        "face_detector_backend": "yolov8",
+    })
+
+    assert plan.plugins == ["objects", "FaceRecognitionPlugin"]
+    assert plan.sample_interval_seconds == 2.0
+    assert isinstance(plan.sample_interval_seconds, float)
+    assert plan.target_resolution_height == 480
+    assert not plan.enable_ocr
+    assert not plan.enable_captions
+    assert not plan.enable_emotion
+    assert plan.face_detector_backend == "yolov8"
+
+
+@pytest.mark.parametrize("settings", [
+    {"plugins": "objects"},
+    {"plugins": ["objects", 3]},
+    {"sample_interval_seconds": 0},
+    {"sample_interval_seconds": -1.5},
+    {"sample_interval_seconds": True},
+    {"sample_interval_seconds": "2"},
+    {"target_resolution_height": 0},
+    {"target_resolution_height": 720.0},
+    {"target_resolution_height": True},
+    {"ocr": "yes"},
+    {"captions": 1},
+    {"emotion": 0},
+    {"face_detector_backend": ""},
+    {"face_detector_backend": 5},
+])
+def test_invalid_settings_raise(settings):
+    with pytest.raises(ValueError):
+        AnalysisPlan.from_settings(settings)
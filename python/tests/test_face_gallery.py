@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+
+from services.analysis.face_gallery import KnownFaceGallery
+
+# Unit embedding per image file name
+VECTORS = {
+    "alice_1.jpg": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "alice_2.jpg": np.array([0.9, 0.1, 0.0], dtype=np.float32),
+    "bob_1.jpg": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+}
+
+
+@pytest.fixture
+def faces_dir(tmp_path):
+    for name in VECTORS:
+        person = tmp_path / name.split("_")[0]
+        person.mkdir(exist_ok=True)
+        (person / name).write_bytes(b"")
+    return tmp_path
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Paths embedded so far, with the model replaced by VECTORS."""
+    calls = []
+
+    def embed_image(self, path):
+        calls.append(os.path.basename(path))
+        vector = VECTORS[os.path.basename(path)]
+        return [vector / np.linalg.norm(vector)]
+
+    monkeypatch.setattr(KnownFaceGallery, "_embed_image", embed_image)
+    return calls
+
+
+def make_gallery(faces_dir):
+    return KnownFaceGallery(str(faces_dir), model="VGG-Face", detector_backend="skip")
+
+
+def test_load_embeds_every_image(faces_dir, embedded):
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+
+    embeddings, labels, sources = gallery.snapshot()
+    assert sorted(embedded) == sorted(VECTORS)
+    assert embeddings.shape == (3, 3)
+    assert sorted(labels.tolist()) == ["alice", "alice", "bob"]
+    assert len(sources) == 3
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+
+
+def test_match_returns_closest_label_within_tolerance(faces_dir, embedded):
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+
+    label, distance = gallery.match(np.array([0.1, 2.0, 0.0]), tolerance=0.1)
+    assert label == "bob"
+    assert distance < 0.1
+
+    assert gallery.match(np.array([0.0, 0.0, 1.0]), tolerance=0.1) is None
+    assert gallery.match(np.zeros(3), tolerance=1.0) is None
+
+
+def test_refresh_only_embeds_changed_images(faces_dir, embedded):
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+    embedded.clear()
+
+    (faces_dir / "bob" / "bob_1.jpg").unlink()
+    changed = faces_dir / "alice" / "alice_2.jpg"
+    mtime = changed.stat().st_mtime + 10
+    os.utime(changed, (mtime, mtime))
+    gallery.refresh()
+
+    assert embedded == ["alice_2.jpg"]
+    assert gallery.labels.tolist() == ["alice", "alice"]
+    assert gallery.match(np.array([0.0, 1.0, 0.0]), tolerance=0.1) is None
+
+
+def test_cache_avoids_embedding_unchanged_images(faces_dir, embedded):
+    make_gallery(faces_dir).load()
+    embedded.clear()
+
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+
+    assert embedded == []
+    assert sorted(gallery.labels.tolist()) == ["alice", "alice", "bob"]
+
+
+def test_snapshot_survives_refresh(faces_dir, embedded):
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+    embeddings, labels, sources = gallery.snapshot()
+
+    (faces_dir / "bob" / "bob_1.jpg").unlink()
+    gallery.refresh()
+
+    assert len(embeddings) == len(labels) == len(sources) == 3
+    assert len(gallery.embeddings) == len(gallery.labels) == len(gallery.sources) == 2
+
+
+def test_metadata_is_cached_per_person(faces_dir, embedded):
+    (faces_dir / "alice" / "metadata.json").write_text('{"role": "host"}')
+    gallery = make_gallery(faces_dir)
+    gallery.load()
+
+    assert gallery.get_metadata("alice") == {"role": "host"}
+    assert gallery.get_metadata("bob") is None
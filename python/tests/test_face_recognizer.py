@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+
+from services.analysis.face_recognizer import EMOTION_LABELS, FaceRecognizer
+
+
+class StubEmotionModel:
+    """Scores every face in a batch with a fixed emotion and records the batches."""
+
+    def __init__(self, emotion):
+        self.batches = []
+        self.emotion = emotion
+
+    def predict(self, batch):
+        self.batches.append(batch)
+        predictions = np.full((len(batch), len(EMOTION_LABELS)), 0.1, dtype=np.float32)
+        predictions[:, EMOTION_LABELS.index(self.emotion)] = 0.4
+        return predictions
+
+
+def test_classify_emotions_runs_one_batch_for_faces_of_different_sizes(monkeypatch):
+    recognizer = FaceRecognizer()
+    model = StubEmotionModel("happy")
+    recognizer._emotion_model = model
+    monkeypatch.setattr(
+        recognizer, "_analyze_emotion",
+        lambda face_img: pytest.fail("fell back to per-face analysis"))
+
+    rng = np.random.default_rng(0)
+    crops = [
+        rng.integers(0, 256, size=shape, dtype=np.uint8)
+        for shape in ((80, 60, 3), (120, 100, 3), (50, 50, 3))
+    ]
+    emotions = recognizer.classify_emotions(crops)
+
+    assert len(model.batches) == 1
+    batch = model.batches[0]
+    assert batch.shape == (3, 224, 224, 3)
+    assert batch.max() <= 1.0
+    assert [emotion["emotion"] for emotion in emotions] == ["happy"] * 3
+    assert emotions[0]["confidence"] == pytest.approx(40.0)
+
+
+def test_classify_emotions_without_faces():
+    assert FaceRecognizer().classify_emotions([]) == []
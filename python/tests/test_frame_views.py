@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from utils import frame_views
+from utils.frame_views import VideoFrame, get_view, register_view
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 256, size=(120, 200, 3), dtype=np.uint8)
+
+
+def test_video_frame_behaves_as_its_array(image):
+    frame = VideoFrame(image)
+    assert isinstance(frame, np.ndarray)
+    assert frame.shape == image.shape
+    assert np.array_equal(frame, image)
+
+
+def test_views_are_computed_once(image):
+    frame = VideoFrame(image)
+    first = get_view(frame, "gray")
+    assert get_view(frame, "gray") is first
+    assert np.array_equal(first, cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+
+
+def test_view_values_and_sizes(image):
+    frame = VideoFrame(image)
+    assert np.array_equal(get_view(frame, "rgb"), image[:, :, ::-1])
+    assert get_view(frame, "half").shape == (60, 100, 3)
+    assert get_view(frame, "half_gray").shape == (60, 100)
+    assert get_view(frame, "tiny_rgb").shape == (100, 100, 3)
+    assert get_view(frame, "tiny_gray").shape == (100, 100)
+    assert get_view(frame, "tiny_hsv").shape == (100, 100, 3)
+    assert get_view(frame, "gray_32").shape == (32, 32)
+    assert get_view(frame, "thumbnail").shape == (192, 320, 3)
+
+
+def test_derived_views_share_their_source(image):
+    frame = VideoFrame(image)
+    get_view(frame, "tiny_rgb")
+    tiny = get_view(frame, "tiny")
+    assert np.array_equal(get_view(frame, "tiny_rgb"), cv2.cvtColor(tiny, cv2.COLOR_BGR2RGB))
+    assert set(frame._views) == {"tiny", "tiny_rgb"}
+
+
+def test_plain_arrays_are_not_cached(image):
+    first = get_view(image, "gray")
+    assert get_view(image, "gray") is not first
+    assert np.array_equal(get_view(image, "gray"), first)
+
+
+def test_slices_do_not_share_the_cache(image):
+    frame = VideoFrame(image)
+    get_view(frame, "gray")
+    crop = frame[10:50, 20:80]
+    assert get_view(crop, "gray").shape == (40, 60)
+
+
+def test_unknown_view(image):
+    with pytest.raises(KeyError):
+        get_view(VideoFrame(image), "sepia")
+
+
+def test_register_view(image, monkeypatch):
+    monkeypatch.setattr(frame_views, "VIEW_BUILDERS", dict(frame_views.VIEW_BUILDERS))
+    register_view("flipped", lambda frame: frame[:, ::-1])
+    frame = VideoFrame(image)
+    assert np.array_equal(get_view(frame, "flipped"), image[:, ::-1])
@@ -0,0 +1,62 @@
+from services.analysis.gating import DEFAULT_GATING_RULES, contains_label, faces_changed
+
+
+def face(name, x, y, width=100, frame_width=1920, frame_height=1080):
+    return {
+        "name": name,
+        "bbox": {"x": x, "y": y, "width": width, "height": width},
+        "frame_dimensions": {"width": frame_width, "height": frame_height},
+    }
+
+
+def test_contains_label():
+    condition = contains_label("objects", "person")
+    assert condition({"objects": [{"label": "car"}, {"label": "person"}]}, None)
+    assert not condition({"objects": [{"label": "car"}]}, None)
+    assert not condition({"objects": []}, None)
+    assert not condition({"objects": None}, None)
+    assert not condition({}, None)
+
+
+def test_faces_changed_without_previous_frame():
+    condition = faces_changed()
+    current = {"faces": [face("Alice", 100, 100)]}
+    assert condition(current, None)
+    assert condition(current, {"objects": []})
+
+
+def test_faces_changed_ignores_small_moves():
+    condition = faces_changed()
+    previous = {"faces": [face("Alice", 100, 100)]}
+    assert not condition({"faces": [face("Alice", 110, 105)]}, previous)
+
+
+def test_faces_changed_ignores_order():
+    condition = faces_changed()
+    previous = {"faces": [face("Alice", 100, 100), face("Bob", 1500, 100)]}
+    current = {"faces": [face("Bob", 1500, 100), face("Alice", 100, 100)]}
+    assert not condition(current, previous)
+
+
+def test_faces_changed_on_name_count_or_position():
+    condition = faces_changed()
+    previous = {"faces": [face("Alice", 100, 100)]}
+    assert condition({"faces": [face("Bob", 100, 100)]}, previous)
+    assert condition({"faces": [face("Alice", 100, 100), face("Bob", 1500, 100)]}, previous)
+    assert condition({"faces": []}, previous)
+    assert condition({"faces": [face("Alice", 1000, 100)]}, previous)
+    assert condition({"faces": [face("Alice", 100, 100, width=600)]}, previous)
+
+
+def test_default_rules():
+    rules = {rule.plugin: rule for rule in DEFAULT_GATING_RULES}
+
+    faces = rules["FaceRecognitionPlugin"]
+    assert faces.reads == ("objects",)
+    assert faces.skip_output == {"faces": []}
+    assert not faces.condition({"objects": [{"label": "dog"}]}, None)
+
+    shot_type = rules["ShotTypePlugin"]
+    assert shot_type.reads == ("faces",)
+    # Reuses the previous frame's shot type when gated
+    assert shot_type.skip_output is None
@@ -0,0 +1,90 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+import pytest
+
+av = pytest.importorskip("av")
+
+from core.config import AnalysisConfig
+from services.analysis.processor import FrameProcessor
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    """FrameProcessor whose decoder yields numbered frames until it is cancelled."""
+    processor = FrameProcessor(AnalysisConfig())
+    processor.decoded = 0
+
+    def extract_frames_streaming(video_path, job_id, cancel_flag=None, **kwargs):
+        for number in itertools.count():
+            if cancel_flag and cancel_flag.is_set():
+                return
+            processor.decoded += 1
+            yield {"sampled_frame_number": number}
+
+    monkeypatch.setattr(processor, "extract_frames_streaming", extract_frames_streaming)
+    return processor
+
+
+def decoder_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("frame-decoder-")]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_cancel_stops_decoder_while_consumer_is_busy(processor):
+    cancel_flag = threading.Event()
+    frames = processor.extract_frames_pipelined("video.mp4", "job", cancel_flag)
+    next(frames)
+
+    # The consumer holds the generator without pulling frames, as plugins do while busy
+    cancel_flag.set()
+    assert wait_for(lambda: not decoder_threads())
+    decoded = processor.decoded
+    time.sleep(0.1)
+    assert processor.decoded == decoded
+    frames.close()
+
+
+def test_cancel_is_seen_on_every_dequeue(processor):
+    cancel_flag = threading.Event()
+    frames = processor.extract_frames_pipelined("video.mp4", "job", cancel_flag)
+    next(frames)
+    # Frames are already queued, yet none is handed out after cancellation
+    assert wait_for(lambda: processor.decoded > 2)
+    cancel_flag.set()
+    assert list(frames) == []
+
+
+def test_closing_joins_decoder(processor):
+    frames = processor.extract_frames_pipelined("video.mp4", "job")
+    next(frames)
+    frames.close()
+    assert not decoder_threads()
+
+
+def decoded_frame(width=640, height=480):
+    return av.VideoFrame.from_ndarray(np.zeros((height, width, 3), dtype=np.uint8), format="bgr24")
+
+
+def test_full_resolution_frame_kept_only_when_requested():
+    processor = FrameProcessor(AnalysisConfig())
+
+    kept = processor._prepare_frame(decoded_frame(), 240, keep_full_resolution=True)
+    assert kept['scale_factor'] == 2.0
+    assert kept['source_frame'].to_ndarray().shape == (480, 640, 3)
+
+    assert 'source_frame' not in processor._prepare_frame(
+        decoded_frame(), 240, keep_full_resolution=False)
+    # Frames analysed at their own resolution need no second copy
+    assert 'source_frame' not in processor._prepare_frame(
+        decoded_frame(), 720, keep_full_resolution=True)
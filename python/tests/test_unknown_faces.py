@@ -0,0 +1,187 @@
+import os
+
+import numpy as np
+import pytest
+
+from services.analysis.unknown_faces import (
+    ID_RESERVE_BLOCK,
+    PersistentUnknownFaceStore,
+    UnknownFaceEmbeddingIndex,
+    UnknownFaceRegistry,
+)
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestUnknownFaceRegistry:
+    def test_search_empty(self):
+        assert UnknownFaceRegistry().search(unit(1, 0, 0)) is None
+
+    def test_search_returns_closest_cluster(self):
+        registry = UnknownFaceRegistry(initial_capacity=1)
+        registry.add("Unknown_000", unit(1, 0, 0))
+        registry.add("Unknown_001", unit(0, 1, 0))
+        registry.add("Unknown_002", unit(0, 0, 1))
+
+        row, similarity = registry.search(np.array([0.1, 3.0, 0.0]))
+        assert registry.ids[row] == "Unknown_001"
+        assert similarity == pytest.approx(float(unit(0.1, 3.0, 0.0)[1]))
+
+    def test_update_keeps_running_mean(self):
+        registry = UnknownFaceRegistry()
+        row = registry.add("Unknown_000", np.array([1.0, 0.0]))
+        assert registry.update(row, np.array([0.0, 1.0])) == 2
+        assert registry.appearances(row) == 2
+        assert np.allclose(registry.centroid(row), unit(1, 1))
+
+    def test_growth_keeps_rows(self):
+        registry = UnknownFaceRegistry(initial_capacity=2)
+        vectors = [unit(i + 1, 1, 0) for i in range(5)]
+        for i, vector in enumerate(vectors):
+            registry.add(f"Unknown_{i:03d}", vector)
+
+        assert len(registry) == 5
+        for row, vector in enumerate(vectors):
+            assert np.allclose(registry.centroid(row), vector)
+
+    def test_reset(self):
+        registry = UnknownFaceRegistry()
+        registry.add("Unknown_000", unit(1, 0))
+        registry.reset()
+        assert len(registry) == 0
+        assert registry.search(unit(1, 0)) is None
+
+
+class TestPersistentUnknownFaceStore:
+    def test_round_trip(self, tmp_path):
+        store = PersistentUnknownFaceStore(str(tmp_path), initial_capacity=2)
+        store.load()
+        first = store.add(store.next_face_id(), unit(1, 0, 0))
+        store.update(first, unit(1, 1, 0))
+        store.add(store.next_face_id(), unit(0, 0, 1))
+        store.add(store.next_face_id(), unit(0, 1, 0))
+        store.flush()
+
+        reloaded = PersistentUnknownFaceStore(str(tmp_path))
+        reloaded.load()
+
+        assert reloaded.ids == ["Unknown_000", "Unknown_001", "Unknown_002"]
+        assert reloaded.appearances(0) == 2
+        assert np.allclose(reloaded.centroid(0), store.centroid(0))
+        row, similarity = reloaded.search(unit(0, 0.1, 1))
+        assert reloaded.ids[row] == "Unknown_001"
+        assert similarity > 0.99
+
+    def test_ids_are_not_reused_after_restart(self, tmp_path):
+        store = PersistentUnknownFaceStore(str(tmp_path))
+        store.load()
+        store.next_face_id()
+        store.next_face_id()
+        # No flush: the reserved block must still keep the used IDs
+
+        reloaded = PersistentUnknownFaceStore(str(tmp_path))
+        reloaded.load()
+        number = int(reloaded.next_face_id().rsplit("_", 1)[1])
+        assert number >= 2
+        assert number <= 2 + ID_RESERVE_BLOCK
+
+    def test_flush_without_clusters_persists_counter(self, tmp_path):
+        store = PersistentUnknownFaceStore(str(tmp_path))
+        store.load()
+        store.next_face_id()
+        store.flush()
+
+        reloaded = PersistentUnknownFaceStore(str(tmp_path))
+        reloaded.load()
+        assert len(reloaded) == 0
+        assert reloaded.search(unit(1, 0)) is None
+        assert reloaded.next_face_id() != "Unknown_000"
+
+    def test_prune_keeps_most_seen_clusters(self, tmp_path):
+        store = PersistentUnknownFaceStore(str(tmp_path), initial_capacity=4, max_clusters=10)
+        store.load()
+        for i in range(10):
+            row = store.add(store.next_face_id(), unit(1, i, 0))
+            if i % 2 == 0:
+                store.update(row, unit(1, i, 0))
+
+        store.add("Unknown_new", unit(0, 0, 1))
+
+        assert len(store) == 10
+        assert store.ids[-1] == "Unknown_new"
+        seen_twice = [f"Unknown_{i:03d}" for i in range(0, 10, 2)]
+        assert all(face_id in store.ids for face_id in seen_twice)
+        # Ties go to the newer clusters
+        assert "Unknown_001" not in store.ids
+        for row, face_id in enumerate(store.ids[:-1]):
+            number = int(face_id.rsplit("_", 1)[1])
+            assert np.allclose(store.centroid(row), unit(1, number, 0), atol=1e-6)
+
+        store.flush()
+        reloaded = PersistentUnknownFaceStore(str(tmp_path))
+        reloaded.load()
+        assert reloaded.ids == store.ids
+
+    def test_embedding_size_mismatch(self, tmp_path):
+        store = PersistentUnknownFaceStore(str(tmp_path))
+        store.load()
+        store.add(store.next_face_id(), unit(1, 0, 0))
+        with pytest.raises(ValueError):
+            store.add(store.next_face_id(), unit(1, 0))
+
+
+class TestUnknownFaceEmbeddingIndex:
+    KNOWN_EMBEDDINGS = np.stack([unit(1, 0, 0), unit(0, 1, 0)])
+    KNOWN_LABELS = np.array(["alice", "bob"])
+
+    def save_face(self, index, base_filename, embedding):
+        (index.unknown_faces_dir / f"{base_filename}.json").write_text("{}")
+        return index.save(base_filename, embedding)
+
+    def test_match_assigns_faces_within_tolerance(self, tmp_path):
+        index = UnknownFaceEmbeddingIndex(str(tmp_path))
+        self.save_face(index, "Unknown_000_aaaa", unit(1, 0.05, 0))
+        self.save_face(index, "Unknown_001_bbbb", unit(0, 0, 1))
+
+        reassignments = index.match(self.KNOWN_EMBEDDINGS, self.KNOWN_LABELS, tolerance=0.1)
+
+        assert len(reassignments) == 1
+        match = reassignments[0]
+        assert match["face_id"] == "Unknown_000"
+        assert match["json_file"] == "Unknown_000_aaaa.json"
+        assert match["image_file"] == "Unknown_000_aaaa.jpg"
+        assert match["name"] == "alice"
+        assert match["distance"] < 0.1
+
+    def test_match_restricted_to_names(self, tmp_path):
+        index = UnknownFaceEmbeddingIndex(str(tmp_path))
+        self.save_face(index, "Unknown_000_aaaa", unit(1, 0, 0))
+
+        assert index.match(
+            self.KNOWN_EMBEDDINGS, self.KNOWN_LABELS, tolerance=0.1, names=["bob"]) == []
+
+    def test_refresh_forgets_faces_without_json(self, tmp_path):
+        index = UnknownFaceEmbeddingIndex(str(tmp_path))
+        path = self.save_face(index, "Unknown_000_aaaa", unit(1, 0, 0))
+        assert len(index.match(self.KNOWN_EMBEDDINGS, self.KNOWN_LABELS, tolerance=0.1)) == 1
+
+        (tmp_path / "Unknown_000_aaaa.json").unlink()
+
+        assert index.match(self.KNOWN_EMBEDDINGS, self.KNOWN_LABELS, tolerance=0.1) == []
+        assert not path.exists()
+
+    def test_refresh_reloads_rewritten_embeddings(self, tmp_path):
+        index = UnknownFaceEmbeddingIndex(str(tmp_path))
+        self.save_face(index, "Unknown_000_aaaa", unit(1, 0, 0))
+        index.refresh()
+
+        path = index.save("Unknown_000_aaaa", unit(0, 1, 0))
+        stat = path.stat()
+        # Make sure the rewrite is visible even on coarse timestamp filesystems
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        reassignments = index.match(self.KNOWN_EMBEDDINGS, self.KNOWN_LABELS, tolerance=0.1)
+        assert [match["name"] for match in reassignments] == ["bob"]
@@ -0,0 +1,111 @@
+"""Adaptive batch sizing for batched model inference."""
+from typing import Dict, Optional
+
+# Relative per-item latency gain a larger batch must bring to keep growing
+MIN_IMPROVEMENT = 0.05
+
+
+class AdaptiveBatchSize:
+    """
+    Picks a batch size from measured per-item latency, capped by free memory.
+
+    Starting from `initial`, the batch size doubles as long as the larger
+    size lowers the measured latency per item by at least 5%; after that
+    the fastest measured size is used. Every size is capped
+    by the memory currently available on the device, estimated from
+    `bytes_per_item`, so a busy machine falls back to smaller batches.
+
+    Callers often have fewer items pending than the chosen size, so every
+    call is measured under the number of items it actually processed, and
+    sizes above the largest number of pending items seen so far are not
+    tried until a batch that large shows up.
+
+    Args:
+        max_batch_size (int): Upper bound for the batch size
+        bytes_per_item (int): Rough peak memory needed per batch item
+        memory_fraction (float): Share of available memory a batch may use
+        initial (int): Batch size used before anything is measured
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        bytes_per_item: int = 0,
+        memory_fraction: float = 0.25,
+        initial: int = 1
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.bytes_per_item = bytes_per_item
+        self.memory_fraction = memory_fraction
+        self.current = max(1, min(initial, self.max_batch_size))
+        self.latency_per_item: Dict[int, float] = {}
+        self.largest_pending = 0
+        self._exploring = True
+
+    def next_size(self, pending: int, device: str = "cpu") -> int:
+        """Batch size to use for the next call with `pending` items left."""
+        self.largest_pending = max(self.largest_pending, pending)
+        cap = min(self.max_batch_size, self._memory_cap(device))
+        # A size larger than any batch seen so far could never be measured
+        reachable = min(cap, self.largest_pending)
+        size = min(self.current, reachable)
+
+        if self._exploring and size in self.latency_per_item:
+            larger = size * 2
+            smaller = size // 2
+            if smaller in self.latency_per_item and not self._is_faster(size, smaller):
+                # The last step up didn't pay off
+                self._exploring = False
+            elif larger > cap:
+                self._exploring = False
+            elif larger > reachable:
+                # Wait for a batch large enough to measure the next size
+                pass
+            elif larger not in self.latency_per_item:
+                size = larger
+            elif self._is_faster(larger, size):
+                size = larger
+            else:
+                self._exploring = False
+
+        if not self._exploring:
+            measured = [s for s in self.latency_per_item if s <= reachable]
+            if measured:
+                size = min(measured, key=self.latency_per_item.get)
+
+        self.current = max(1, size)
+        return max(1, min(self.current, pending))
+
+    def record(self, batch_size: int, seconds: float) -> None:
+        """Record the duration of a call under the number of items it processed."""
+        if batch_size <= 0:
+            return
+        per_item = seconds / batch_size
+        previous = self.latency_per_item.get(batch_size)
+        # The first call of a size includes warm-up, so later ones dominate
+        self.latency_per_item[batch_size] = (
+            per_item if previous is None else 0.7 * previous + 0.3 * per_item)
+
+    def _is_faster(self, size: int, than: int) -> bool:
+        """Whether `size` lowers the measured per-item latency of `than` enough to use it."""
+        return self.latency_per_item[size] < self.latency_per_item[than] * (1 - MIN_IMPROVEMENT)
+
+    def _memory_cap(self, device: str) -> int:
+        if self.bytes_per_item <= 0:
+            return self.max_batch_size
+        available = self._available_memory(device)
+        if available is None:
+            return self.max_batch_size
+        return max(1, int(available * self.memory_fraction // self.bytes_per_item))
+
+    @staticmethod
+    def _available_memory(device: str) -> Optional[int]:
+        try:
+            if device == "cuda":
+                import torch
+                free, _ = torch.cuda.mem_get_info()
+                return free
+            import psutil
+            return psutil.virtual_memory().available
+        except Exception:
+            return None
@@ -0,0 +1,77 @@
+"""Per-frame cache of derived images (color spaces and downscales)."""
+from typing import Callable, Dict
+
+import cv2
+import numpy as np
+
+ViewBuilder = Callable[[np.ndarray], np.ndarray]
+
+
+class VideoFrame(np.ndarray):
+    """
+    BGR frame that keeps the views plugins derive from it.
+
+    It behaves as the plain BGR array it wraps; `get_view(frame, name)`
+    computes a named view on first request and returns the same array to
+    every later caller, so each conversion happens once per frame and all
+    plugins see identical input. Views are shared: copy before modifying.
+    """
+
+    def __new__(cls, array: np.ndarray) -> "VideoFrame":
+        frame = np.asarray(array).view(cls)
+        frame._views = {}
+        return frame
+
+    def __array_finalize__(self, obj) -> None:
+        # Slices and arithmetic results are different images with their own cache
+        self._views: Dict[str, np.ndarray] = {}
+
+
+def _resize(frame: np.ndarray, width: int, height: int, interpolation: int) -> np.ndarray:
+    return cv2.resize(frame, (max(1, width), max(1, height)), interpolation=interpolation)
+
+
+VIEW_BUILDERS: Dict[str, ViewBuilder] = {
+    "rgb": lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB),
+    "gray": lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+    "hsv": lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2HSV),
+    # Half resolution, used for OCR
+    "half": lambda frame: _resize(
+        frame, frame.shape[1] // 2, frame.shape[0] // 2, cv2.INTER_LINEAR),
+    "half_rgb": lambda frame: cv2.cvtColor(get_view(frame, "half"), cv2.COLOR_BGR2RGB),
+    "half_gray": lambda frame: cv2.cvtColor(get_view(frame, "half"), cv2.COLOR_BGR2GRAY),
+    # 100x100 (aspect ratio not kept), used for color statistics
+    "tiny": lambda frame: _resize(frame, 100, 100, cv2.INTER_AREA),
+    "tiny_rgb": lambda frame: cv2.cvtColor(get_view(frame, "tiny"), cv2.COLOR_BGR2RGB),
+    "tiny_gray": lambda frame: cv2.cvtColor(get_view(frame, "tiny"), cv2.COLOR_BGR2GRAY),
+    "tiny_hsv": lambda frame: cv2.cvtColor(get_view(frame, "tiny"), cv2.COLOR_BGR2HSV),
+    # 32x32 grey, used for perceptual hashing
+    "gray_32": lambda frame: _resize(get_view(frame, "gray"), 32, 32, cv2.INTER_AREA),
+    # 320 px wide, used for scene thumbnails
+    "thumbnail": lambda frame: _resize(
+        frame, 320, int(frame.shape[0] * 320 / frame.shape[1]), cv2.INTER_AREA),
+}
+
+
+def register_view(name: str, builder: ViewBuilder) -> None:
+    """Add a named view; the builder gets the BGR frame and may request other views."""
+    VIEW_BUILDERS[name] = builder
+
+
+def get_view(frame: np.ndarray, name: str) -> np.ndarray:
+    """
+    Named view of a BGR frame, cached on the frame when it is a VideoFrame.
+
+    Plain arrays (e.g. full-resolution crops) get the view computed without
+    caching. Raises KeyError for an unknown view name.
+    """
+    views = getattr(frame, "_views", None)
+    if views is not None:
+        view = views.get(name)
+        if view is not None:
+            return view
+
+    view = VIEW_BUILDERS[name](frame)
+    if views is not None:
+        views[name] = view
+    return view